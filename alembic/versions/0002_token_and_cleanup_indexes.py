@@ -0,0 +1,68 @@
+"""Indexes for token lookups, token expiry and unverified-user cleanup
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 09:30:00.000000
+
+Indexes are built CONCURRENTLY so the tables stay writable. That cannot run
+inside a transaction, hence the autocommit block. If a build fails it leaves
+an INVALID index behind: drop it and rerun the upgrade.
+
+The unique token indexes fail to build while duplicate tokens exist; refresh
+tokens issued before the ``jti`` claim was added can collide when a user
+logged in twice within one second. Delete the duplicates first, e.g.::
+
+    DELETE FROM refresh_tokens a USING refresh_tokens b
+    WHERE a.token = b.token AND a.id < b.id;
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    # name, table, columns, extra options
+    ("ix_refresh_tokens_token", "refresh_tokens", ["token"], {"unique": True}),
+    ("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"], {}),
+    ("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"], {}),
+    ("ix_verification_tokens_token", "verification_tokens", ["token"], {"unique": True}),
+    ("ix_verification_tokens_user_id", "verification_tokens", ["user_id"], {}),
+    ("ix_verification_tokens_expires_at", "verification_tokens", ["expires_at"], {}),
+    (
+        "ix_users_unverified_created_at",
+        "users",
+        ["created_at"],
+        {"postgresql_where": sa.text("NOT is_verified")},
+    ),
+)
+
+
+def upgrade() -> None:
+    # login never set created_at; let the database fill it
+    op.alter_column("refresh_tokens", "created_at", server_default=sa.func.now())
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **options,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.alter_column("refresh_tokens", "created_at", server_default=None)
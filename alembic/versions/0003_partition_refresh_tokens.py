@@ -0,0 +1,104 @@
+"""Range-partition refresh_tokens by expires_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15 10:00:00.000000
+
+The table is rebuilt as a partitioned table with daily partitions (see
+app.db.partitions) plus a default partition, and unexpired rows are copied
+over; expired ones are simply left behind. The partition key must be part of
+the primary key and of the unique token index. Logins block on the table lock
+while this runs.
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitions import create_partition_sql, partition_days
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, token, created_at, expires_at, revoked"
+INDEXES = ("ix_refresh_tokens_id", "ix_refresh_tokens_token", "ix_refresh_tokens_user_id", "ix_refresh_tokens_expires_at")
+
+
+def _columns():
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('refresh_tokens_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("revoked", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    ]
+
+
+def _set_aside_old_table(new_name: str) -> None:
+    op.rename_table("refresh_tokens", new_name)
+    op.execute(f"ALTER TABLE {new_name} RENAME CONSTRAINT refresh_tokens_pkey TO {new_name}_pkey")
+    for name in INDEXES:
+        op.drop_index(name, table_name=new_name, if_exists=True)
+    # Keep the id sequence when the old table is dropped
+    op.execute("ALTER SEQUENCE refresh_tokens_id_seq OWNED BY NONE")
+
+
+def _create_indexes(token_columns) -> None:
+    op.create_index("ix_refresh_tokens_id", "refresh_tokens", ["id"])
+    op.create_index("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"])
+    op.create_index("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"])
+    op.create_index("ix_refresh_tokens_token", "refresh_tokens", token_columns, unique=True)
+
+
+def upgrade() -> None:
+    _set_aside_old_table("refresh_tokens_unpartitioned")
+
+    op.create_table(
+        "refresh_tokens",
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", "expires_at", name="refresh_tokens_pkey"),
+        postgresql_partition_by="RANGE (expires_at)",
+    )
+    op.execute("ALTER SEQUENCE refresh_tokens_id_seq OWNED BY refresh_tokens.id")
+    _create_indexes(["token", "expires_at"])
+
+    op.execute("CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens DEFAULT")
+    for day in partition_days(datetime.now(timezone.utc).date()):
+        op.execute(create_partition_sql(day))
+
+    op.execute(
+        f"INSERT INTO refresh_tokens ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM refresh_tokens_unpartitioned WHERE expires_at > now()"
+    )
+    op.drop_table("refresh_tokens_unpartitioned")
+
+
+def downgrade() -> None:
+    _set_aside_old_table("refresh_tokens_partitioned")
+
+    op.create_table(
+        "refresh_tokens",
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", name="refresh_tokens_pkey"),
+    )
+    op.execute("ALTER SEQUENCE refresh_tokens_id_seq OWNED BY refresh_tokens.id")
+    _create_indexes(["token"])
+
+    op.execute(
+        f"INSERT INTO refresh_tokens ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM refresh_tokens_partitioned WHERE expires_at > now()"
+    )
+    # Drops every partition with it
+    op.drop_table("refresh_tokens_partitioned")
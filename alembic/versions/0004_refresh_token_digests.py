@@ -0,0 +1,44 @@
+"""Store refresh tokens as SHA-256 digests
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15 10:30:00.000000
+
+Existing rows are backfilled with the digest of their token, so sessions
+survive the upgrade. The unique index moves to ``(token_hash, expires_at)``;
+a 32-byte key keeps it a fraction of the size of the JWT-keyed one. Downgrade
+cannot recover tokens from their digests: it revokes every stored token and
+users have to log in again.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("token_hash", sa.LargeBinary(length=32), nullable=True))
+    op.execute("UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))")
+    op.alter_column("refresh_tokens", "token_hash", nullable=False)
+    op.drop_index("ix_refresh_tokens_token", table_name="refresh_tokens")
+    op.create_index(
+        "ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash", "expires_at"], unique=True
+    )
+    op.drop_column("refresh_tokens", "token")
+
+
+def downgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("token", sa.String(), nullable=True))
+    # The digest is all we have; keep rows unique but unusable
+    op.execute("UPDATE refresh_tokens SET token = encode(token_hash, 'hex'), revoked = true")
+    op.alter_column("refresh_tokens", "token", nullable=False)
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.create_index("ix_refresh_tokens_token", "refresh_tokens", ["token", "expires_at"], unique=True)
+    op.drop_column("refresh_tokens", "token_hash")
@@ -0,0 +1,34 @@
+"""Refresh-token families and single use
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15 11:00:00.000000
+
+Adds ``family`` and ``used_at`` for refresh-token rotation. Existing rows
+keep a NULL family; the token rotated from one starts a family at the old
+token's jti. The family index cannot be built CONCURRENTLY on a partitioned
+table, so it briefly blocks writes to refresh_tokens.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("family", sa.String(length=32), nullable=True))
+    op.add_column("refresh_tokens", sa.Column("used_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_refresh_tokens_family", "refresh_tokens", ["family"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_family", table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "used_at")
+    op.drop_column("refresh_tokens", "family")
@@ -0,0 +1,65 @@
+"""users.token_version, keyset pagination and trigram search indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-15 12:00:00.000000
+
+These were added to the models while the schema was still created by
+create_all, which never alters existing tables, so databases stamped at the
+0001 baseline lack them. Every step is idempotent: databases created from
+the newer models already have some or all of it.
+
+The column add is a catalog-only change (constant default). Indexes are
+built CONCURRENTLY, as in 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ("email", "first_name", "last_name")
+
+INDEXES = (
+    # name, columns, extra options
+    ("ix_users_created_at_id", ["created_at", "id"], {}),
+    ("ix_users_role_created_at_id", ["role", "created_at", "id"], {}),
+    ("ix_users_is_verified_created_at_id", ["is_verified", "created_at", "id"], {}),
+    *(
+        (
+            f"ix_users_{column}_trgm",
+            [column],
+            {"postgresql_using": "gin", "postgresql_ops": {column: "gin_trgm_ops"}},
+        )
+        for column in SEARCH_COLUMNS
+    ),
+)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(
+                name,
+                "users",
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **options,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="users", postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column("users", "token_version")
@@ -1,22 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from datetime import datetime, timedelta, timezone
-from uuid import uuid4
+from datetime import datetime, timezone
 
 from app.db.deps import get_db
-from app.models import User, VerificationToken, RefreshToken
+from app.models import User, VerificationToken
 from app.schemas.user import UserCreate
 from app.schemas.auth import LoginInput, RefreshTokenInput, VerifyInput, Token
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    verify_and_update_password_async,
     create_access_token,
-    create_refresh_token,
+    issue_refresh_token,
     verify_token,
+    user_token_claims,
 )
-from app.core.email import send_email
-from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.services.auth import AuthService
+from app.services.refresh_tokens import refresh_token_store, token_family
 
 # Fixed router - removed invalid parameters
 router = APIRouter(
@@ -28,43 +28,9 @@ router = APIRouter(
 @router.post("/signup", summary="Register a new user", status_code=201)
 async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user and send email verification if enabled."""
-    existing_user = (
-        await db.execute(select(User).where(User.email == user_in.email))
-    ).scalars().first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    hashed_pw = get_password_hash(user_in.password)
-    new_user = User(
-        email=user_in.email,
-        hashed_password=hashed_pw,
-        first_name=user_in.first_name,
-        last_name=user_in.last_name,
-        role=user_in.role,
-        is_verified=False,
-    )
-    db.add(new_user)
-    await db.flush()
-
-    token = str(uuid4())
-    expires = datetime.now(timezone.utc) + timedelta(minutes=15)
-    v_token = VerificationToken(
-        user_id=new_user.id,
-        token=token,
-        expires_at=expires,
-        token_type="email_verification"
-    )
-    db.add(v_token)
-    await db.commit()
-
-    if settings.EMAIL_VERIFICATION_ENABLED:
-        verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
-        await send_email(
-            to_email=new_user.email,
-            subject="Verify your email",
-            template_name="email_verification.html",
-            context={"verification_url": verification_url}
-        )
+    auth_service = AuthService(db)
+    _, token = await auth_service.create_pending_user(user_in)
+    await auth_service.send_verification_email(user_in.email, token)
 
     return {"message": "User registered successfully. Please check your email to verify your account."}
 
@@ -75,22 +41,27 @@ async def login(credentials: LoginInput, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalars().first()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    verified, new_hash = await verify_and_update_password_async(
+        credentials.password, user.hashed_password
+    )
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     if not user.is_verified:
         raise HTTPException(status_code=400, detail="Email not verified")
 
-    access_token = create_access_token({"sub": str(user.id)})
-    refresh_token = create_refresh_token({"sub": str(user.id)})
-    
-    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    db_refresh_token = RefreshToken(
-        user_id=user.id,
-        token=refresh_token,
-        expires_at=expires_at
-    )
-    db.add(db_refresh_token)
+    # Stored hash predates the current cost settings; the new hash is committed
+    # together with the refresh token below.
+    if new_hash:
+        user.hashed_password = new_hash
+
+    access_token = create_access_token(user_token_claims(user))
+    refresh_token, refresh_claims = issue_refresh_token({"sub": str(user.id), "tv": user.token_version})
+    # May be batched with other logins' tokens (REFRESH_TOKEN_WRITE_BEHIND)
+    await refresh_token_store.add(db, user.id, refresh_token, refresh_claims, defer=True)
     await db.commit()
 
     return {
@@ -102,7 +73,11 @@ async def login(credentials: LoginInput, db: AsyncSession = Depends(get_db)):
 
 @router.post("/refresh", response_model=Token, summary="Refresh access token")
 async def refresh_token(data: RefreshTokenInput, db: AsyncSession = Depends(get_db)):
-    """Refresh access token using a valid refresh token."""
+    """Exchange a refresh token for new access and refresh tokens.
+
+    Refresh tokens are single use: reusing one revokes every token rotated
+    from the same login.
+    """
     try:
         payload = verify_token(data.refresh_token)
         if payload.get("type") != "refresh":
@@ -110,21 +85,26 @@ async def refresh_token(data: RefreshTokenInput, db: AsyncSession = Depends(get_
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid refresh token") from e
 
-    token = (await db.execute(
-        select(RefreshToken)
-        .where(RefreshToken.token == data.refresh_token)
-        .where(RefreshToken.revoked == False)
-        .where(RefreshToken.expires_at > datetime.now(timezone.utc))
-    )).scalars().first()
-    
-    if not token:
+    user_id = await refresh_token_store.spend(db, data.refresh_token, payload)
+    if user_id is None:
         raise HTTPException(status_code=400, detail="Invalid or expired refresh token")
 
-    access_token = create_access_token({"sub": str(token.user_id)})
-    
+    # Re-read the user so the new access token carries current role/version claims
+    user = await user_cache.get(db, user_id)
+    if not user or payload.get("tv", 0) != user.token_version:
+        raise HTTPException(status_code=400, detail="Invalid or expired refresh token")
+
+    access_token = create_access_token(user_token_claims(user))
+    new_refresh_token, refresh_claims = issue_refresh_token(
+        {"sub": str(user.id), "tv": user.token_version}, family=token_family(payload)
+    )
+    # Commits the spent token together with its replacement
+    await refresh_token_store.add(db, user.id, new_refresh_token, refresh_claims)
+    await db.commit()
+
     return {
         "access_token": access_token,
-        "refresh_token": data.refresh_token,
+        "refresh_token": new_refresh_token,
         "token_type": "bearer"
     }
 
@@ -152,5 +132,6 @@ async def verify_email(data: VerifyInput, db: AsyncSession = Depends(get_db)):
     token.revoked_at = datetime.now(timezone.utc)
     
     await db.commit()
+    await user_cache.invalidate([user.id])
     
     return {"message": "Email verified successfully"}
\ No newline at end of file
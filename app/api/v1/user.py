@@ -1,39 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.db.deps import get_db
-from app.models import User, UserRole
-from app.schemas.user import UserRead, UserUpdate, UserRoleUpdate
-from app.core.auth import get_current_user, require_admin
-from app.core.security import get_password_hash
-from typing import List
+from app.db.database import AsyncReadSessionLocal
+from app.db.deps import get_db, get_read_db
+from app.models import USER_RECORD_COLUMNS, User, UserRecord, UserRole, update_user_record
+from app.schemas.user import (
+    BulkOperationResult,
+    BulkRoleUpdate,
+    UserFileFormat,
+    UserFilter,
+    UserImportResult,
+    UserPage,
+    UserRead,
+    UserRoleUpdate,
+    UserSelection,
+    UserUpdate,
+)
+from app.core.auth import Principal, get_current_user, get_unrevoked_principal, require_admin
+from app.core.security import hash_password
+from app.core.user_cache import user_cache
+from app.core.config import settings
+from app.services.user_bulk import bulk_change_role, bulk_delete, bulk_verify
+from app.services.user_import import import_users, parse_import_rows
+from app.services.users import decode_cursor, encode_cursor, user_filter_conditions, user_search_query
+from typing import List, Optional
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 50
+# Shorter terms have no trigrams to use the GIN indexes and scan the table
+MIN_SEARCH_LENGTH = 3
+
 @router.get("/me",
     summary="Get current user",
     description="Returns the currently authenticated user's profile information.",
     response_model=UserRead)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: UserRecord = Depends(get_current_user)):
     return current_user
 
 @router.get("/",
-    summary="List all users",
-    description="Returns a list of all users. Accessible only by admin users.",
-    response_model=List[UserRead])
+    summary="List users",
+    description="Returns users newest first, one page at a time. Pass `next_cursor` "
+                "from the previous page as `cursor` to continue. Accessible only by admin users.",
+    response_model=UserPage)
 async def list_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+    filters: UserFilter = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
+):
+    query = (
+        select(*USER_RECORD_COLUMNS)
+        .where(*user_filter_conditions(filters))
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, user_id = decode_cursor(cursor)
+        query = query.where(tuple_(User.created_at, User.id) < tuple_(created_at, user_id))
+
+    users = [UserRecord.from_row(row) for row in (await db.execute(query)).all()]
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+    return {"items": users, "next_cursor": next_cursor}
+
+EXPORT_COLUMNS = (
+    User.id,
+    User.email,
+    User.first_name,
+    User.last_name,
+    User.role,
+    User.is_verified,
+    User.created_at,
+    User.updated_at,
+)
+EXPORT_BATCH_SIZE = 1000
+
+def _export_value(value):
+    if isinstance(value, UserRole):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _stream_users(export_format: UserFileFormat, filters: UserFilter):
+    # The request's session is closed before the body streams, so open our own
+    async with AsyncReadSessionLocal() as session:
+        result = await session.stream(
+            select(*EXPORT_COLUMNS)
+            .where(*user_filter_conditions(filters))
+            .order_by(User.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        keys = list(result.keys())
+        if export_format == UserFileFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(keys)
+            yield buffer.getvalue()
+            async for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([[_export_value(value) for value in row] for row in rows])
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(keys, map(_export_value, row))), separators=(",", ":")) + "\n"
+                    for row in rows
+                )
+
+@router.get("/export",
+    summary="Export users",
+    description="Streams all matching users as NDJSON or CSV without buffering the table. "
+                "Accessible only by admin users.",
+    response_class=StreamingResponse)
+async def export_users(
+    format: UserFileFormat = Query(UserFileFormat.NDJSON),
+    filters: UserFilter = Depends(),
+    _: Principal = Depends(require_admin),
+):
+    if format == UserFileFormat.CSV:
+        media_type, filename = "text/csv", "users.csv"
+    else:
+        media_type, filename = "application/x-ndjson", "users.ndjson"
+    return StreamingResponse(
+        _stream_users(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/import",
+    summary="Bulk import users",
+    description="Creates users from an NDJSON or CSV request body with the same fields as signup "
+                "(`email`, `password`, `first_name`, `last_name`, `role`). Existing emails are "
+                "skipped and invalid rows reported by line. Verification emails are queued in "
+                "batches. Accessible only by admin users.",
+    response_model=UserImportResult)
+async def bulk_import_users(
+    request: Request,
+    format: UserFileFormat = Query(UserFileFormat.NDJSON),
+    db: AsyncSession = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    rows, errors = parse_import_rows(await request.body(), format, settings.USER_IMPORT_MAX_ROWS)
+    return await import_users(db, rows, errors)
+
+@router.post("/bulk/role",
+    summary="Change role of many users",
+    description="Sets the role of every user selected by `ids` or `filter` in one statement and "
+                "revokes their outstanding tokens. Selections over `BULK_MAX_ROWS` users are "
+                "rejected with 422. Accessible only by admin users.",
+    response_model=BulkOperationResult)
+async def bulk_change_user_role(
+    body: BulkRoleUpdate,
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_admin)
+    _: Principal = Depends(require_admin),
 ):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+    return await bulk_change_role(db, body, body.role)
+
+@router.post("/bulk/verify",
+    summary="Verify many users",
+    description="Marks every user selected by `ids` or `filter` as verified. "
+                "Selections over `BULK_MAX_ROWS` users are rejected with 422. "
+                "Accessible only by admin users.",
+    response_model=BulkOperationResult)
+async def bulk_verify_users(
+    body: UserSelection,
+    db: AsyncSession = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    return await bulk_verify(db, body)
+
+@router.post("/bulk/delete",
+    summary="Delete many users",
+    description="Deletes every user selected by `ids` or `filter` together with their tokens. "
+                "Selections over `BULK_MAX_ROWS` users are rejected with 422. "
+                "Accessible only by admin users.",
+    response_model=BulkOperationResult)
+async def bulk_delete_users(
+    body: UserSelection,
+    db: AsyncSession = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    return await bulk_delete(db, body)
+
+@router.get("/search",
+    summary="Search users",
+    description="Case-insensitive prefix and substring search over email, first and last name, "
+                "best matches first. `q` must have at least 3 characters besides surrounding "
+                "whitespace. Accessible only by admin users.",
+    response_model=List[UserRead])
+async def search_users(
+    q: str = Query(..., min_length=MIN_SEARCH_LENGTH, max_length=100),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    db: AsyncSession = Depends(get_read_db),
+    _: Principal = Depends(require_admin),
+):
+    q = q.strip()
+    if len(q) < MIN_SEARCH_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Search term must be at least {MIN_SEARCH_LENGTH} characters",
+        )
+    query = user_search_query(q, limit, db.bind.dialect.name)
+    return [UserRecord.from_row(row) for row in (await db.execute(query)).all()]
 
 @router.get("/{user_id}",
     summary="Get user by ID",
     description="Returns a user's profile information by ID. Accessible only by admin users.",
     response_model=UserRead)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db), _: User = Depends(require_admin)):
-    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db), _: Principal = Depends(require_admin)):
+    user = await user_cache.get(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -46,27 +236,25 @@ async def update_user(
     user_id: int,
     updates: UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_unrevoked_principal)
 ):
-    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Restrict non-admins to updating only their own data
-    if current_user.role.value != "ADMIN" and current_user.id != user_id:
+    if not current_user.is_admin and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not allowed to update this user")
 
     update_data = updates.model_dump(exclude_unset=True)
     
     # Handle password hashing separately
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-
-    for key, value in update_data.items():
-        setattr(user, key, value)
+        update_data["hashed_password"] = await hash_password(update_data.pop("password"))
+        # Log out existing sessions after a password change
+        update_data["token_version"] = User.token_version + 1
 
+    user = await update_user_record(db, user_id, update_data)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     await db.commit()
-    await db.refresh(user)
+    await user_cache.invalidate([user_id])
     return user
 
 @router.delete("/{user_id}",
@@ -76,13 +264,14 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ):
     user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     await db.delete(user)
     await db.commit()
+    await user_cache.invalidate([user_id])
     return {"message": "User deleted"}
 
 @router.patch("/{user_id}/role",
@@ -93,17 +282,15 @@ async def change_user_role(
     user_id: int,
     new_role: UserRoleUpdate,
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
-    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    user = await update_user_record(db, user_id, {
+        "role": UserRole(new_role.role.value),
+        # Outstanding tokens carry the old role
+        "token_version": User.token_version + 1,
+    })
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-
-    role_value = new_role.role
-    if role_value not in UserRole.__members__:
-        raise HTTPException(status_code=400, detail="Invalid role")
-
-    user.role = role_value
     await db.commit()
-    await db.refresh(user)
-    return user
\ No newline at end of file
+    await user_cache.invalidate([user_id])
+    return user
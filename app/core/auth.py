@@ -1,39 +1,78 @@
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from app.core.config import settings
+from app.core.security import decode_access_token
+from app.core.user_cache import user_cache
 from app.db.deps import get_db
-from app.models import User
+from app.models import UserRecord, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated identity built from access-token claims alone."""
+    id: int
+    role: UserRole
+    is_verified: bool
+    token_version: int
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
 
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Resolve the caller from the token without touching the database.
+
+    Role changes and password resets bump ``token_version``; a principal from
+    this dependency alone keeps the claims it was issued with until the
+    access token expires. Routes that grant privileges or write data use
+    ``get_unrevoked_principal`` instead.
+    """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        payload = decode_access_token(token)
+        if payload.get("type") != "access":
+            raise _credentials_exception()
+        return Principal(
+            id=int(payload["sub"]),
+            role=UserRole(payload["role"]),
+            is_verified=bool(payload["verified"]),
+            token_version=int(payload["tv"]),
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
 
-    user = (await db.execute(select(User).where(User.id == int(user_id)))).scalars().first()
-    if not user:
-        raise credentials_exception
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> UserRecord:
+    """Load the user's profile (via the user cache), for routes that need more than the principal."""
+    user = await user_cache.get(db, principal.id)
+    if not user or user.token_version != principal.token_version:
+        raise _credentials_exception()
 
     return user
 
-async def require_admin(current_user: User = Depends(get_current_user)) -> User:
-    if current_user.role.value != "ADMIN":
+async def get_unrevoked_principal(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """The principal, provided its token's ``tv`` still matches the user (via the user cache)."""
+    user = await user_cache.get(db, principal.id)
+    if not user or user.token_version != principal.token_version:
+        raise _credentials_exception()
+    return principal
+
+async def require_admin(principal: Principal = Depends(get_unrevoked_principal)) -> Principal:
+    if not principal.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    return current_user
+    return principal
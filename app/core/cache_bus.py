@@ -0,0 +1,116 @@
+"""
+Cache invalidation bus shared by all gunicorn workers.
+
+Every worker subscribes at startup and evicts the announced user ids from
+its in-process cache. The Redis backend uses pub/sub; the local backend is an
+in-process stand-in for single-worker deployments and tests.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import create_pubsub_client, get_redis
+
+logger = logging.getLogger(__name__)
+
+EvictHandler = Callable[[List[int]], None]
+ResetHandler = Callable[[], None]
+
+
+class InvalidationBus(ABC):
+    @abstractmethod
+    async def start(self, on_evict: EvictHandler, on_reset: ResetHandler) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, user_ids: List[int]) -> None:
+        ...
+
+    async def stop(self) -> None:
+        pass
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """Delivers invalidations within the current process only."""
+
+    def __init__(self):
+        self._on_evict: Optional[EvictHandler] = None
+
+    async def start(self, on_evict: EvictHandler, on_reset: ResetHandler) -> None:
+        self._on_evict = on_evict
+
+    async def publish(self, user_ids: List[int]) -> None:
+        if self._on_evict is not None:
+            self._on_evict(user_ids)
+
+
+class RedisInvalidationBus(InvalidationBus):
+    """Redis pub/sub bus.
+
+    Messages published while a worker is disconnected are lost, so the worker
+    clears its whole local cache every time it (re)subscribes.
+    """
+
+    def __init__(self, channel: str, retry_delay: float = 1.0):
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_evict: EvictHandler, on_reset: ResetHandler) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(on_evict, on_reset))
+
+    async def _listen(self, on_evict: EvictHandler, on_reset: ResetHandler) -> None:
+        client = create_pubsub_client()
+        try:
+            while True:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(self.channel)
+                    on_reset()
+                    while True:
+                        # Returns None when the channel stays idle; each call
+                        # PINGs a connection idle past the health-check interval
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=settings.REDIS_PUBSUB_HEALTH_CHECK_INTERVAL,
+                        )
+                        if message is not None and message["type"] == "message":
+                            on_evict(json.loads(message["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except (RedisError, OSError, ValueError) as e:
+                    logger.warning(f"Cache invalidation subscriber disconnected: {e}")
+                finally:
+                    await pubsub.close()
+                await asyncio.sleep(self.retry_delay)
+        finally:
+            await client.close()
+
+    async def publish(self, user_ids: List[int]) -> None:
+        try:
+            await get_redis().publish(self.channel, json.dumps(user_ids))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def build_invalidation_bus() -> InvalidationBus:
+    if settings.CACHE_INVALIDATION_BACKEND == "redis":
+        return RedisInvalidationBus(settings.CACHE_INVALIDATION_CHANNEL)
+    if settings.CACHE_INVALIDATION_BACKEND == "local":
+        return LocalInvalidationBus()
+    raise ValueError(f"Unknown CACHE_INVALIDATION_BACKEND {settings.CACHE_INVALIDATION_BACKEND!r}")
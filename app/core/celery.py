@@ -1,6 +1,7 @@
 import logging
 import os
 import ssl
+from datetime import timedelta
 from typing import Dict, Any
 
 from celery import Celery
@@ -16,6 +17,8 @@ celery_app = Celery(
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_BACKEND_URL,
     broker_connection_retry_on_startup=True,
+    # Imported by workers and beat so the tasks are registered
+    include=["app.tasks.cleanup", "app.tasks.email"],
 )
 
 celery_app.conf.update(
@@ -57,7 +60,7 @@ celery_app.conf.update(
 )
 
 def route_task(name, args, kwargs, options, task=None, **kw):
-    if name.startswith('app.tasks.cleanup'):
+    if name.startswith(('app.tasks.cleanup', 'cleanup.')):
         return {'queue': 'cleanup'}
     if name.startswith('app.tasks.email'):
         return {'queue': 'email'}
@@ -65,6 +68,13 @@ def route_task(name, args, kwargs, options, task=None, **kw):
 
 celery_app.conf.task_routes = (route_task,)
 
+celery_app.conf.beat_schedule = {
+    "maintain-refresh-token-partitions": {
+        "task": "cleanup.refresh_token_partitions",
+        "schedule": timedelta(hours=1),
+    },
+}
+
 def task_with_retry(self, *args, **kwargs):
     try:
         return self.run(*args, **kwargs)
@@ -15,9 +15,57 @@ class Settings(BaseSettings):
     JWT_REFRESH_SECRET_KEY: str = "test-jwt-refresh-secret-key-for-testing-only"
     JWT_ALGORITHM: str = "HS256"
     JWT_ISSUER: str = "Coffee Shop API"
+    # Token codec: "jose" (python-jose), "pyjwt" (PyJWT) or "hs256" (built-in, HS256 only)
+    JWT_BACKEND: str = "jose"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
-    
+    # Daily refresh_tokens partitions kept ready beyond the token lifetime
+    REFRESH_TOKEN_PARTITIONS_AHEAD_DAYS: int = 3
+    # Where issued refresh tokens are recorded: "postgres" (refresh_tokens
+    # table) or "redis" (jti -> user id, expiring with the token; Postgres
+    # remains the fallback while Redis is unreachable)
+    REFRESH_TOKEN_STORE: str = "postgres"
+    # Write-behind for refresh tokens issued at login (Postgres store): rows
+    # are inserted in batches every FLUSH_INTERVAL_MS or FLUSH_ROWS rows.
+    # A worker that dies loses at most one interval of unflushed tokens; with
+    # MAX_PENDING rows waiting, logins write synchronously again.
+    REFRESH_TOKEN_WRITE_BEHIND: bool = False
+    REFRESH_TOKEN_FLUSH_INTERVAL_MS: int = 50
+    REFRESH_TOKEN_FLUSH_ROWS: int = 500
+    REFRESH_TOKEN_MAX_PENDING: int = 5000
+
+    # Verified access-token claims are cached in-process (never past their exp)
+    JWT_CACHE_ENABLED: bool = True
+    JWT_CACHE_MAX_SIZE: int = 10000
+    JWT_CACHE_TTL_SECONDS: int = 300
+
+    # Password hashing runs in a dedicated process pool so bcrypt/argon2 never
+    # block the event loop. A pool size of 0 falls back to the default thread pool.
+    PASSWORD_HASH_POOL_SIZE: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+
+    # Hash cost parameters; run `python -m app.core.hash_calibration` on the
+    # target hardware to pick values. Stored hashes are rehashed on login
+    # whenever they no longer match these parameters.
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
+    # Bulk user import. Passwords are hashed on a short-lived pool of this many
+    # processes (0 = default thread pool); keep it below the core count so
+    # logins still get CPU while an import runs. The import runs inside the
+    # request: keep MAX_ROWS / (WORKERS / hash time) below the proxy timeout
+    # (500 rows is ~30s with 4 workers at 250 ms per hash).
+    USER_IMPORT_MAX_ROWS: int = 500
+    USER_IMPORT_HASH_WORKERS: int = 4
+    USER_IMPORT_EMAIL_BATCH_SIZE: int = 100
+    USER_IMPORT_VERIFICATION_TOKEN_HOURS: int = 48
+
+    # Bulk role/verify/delete: most users one selection may match (422 above)
+    BULK_MAX_ROWS: int = 10000
+
     CORS_ORIGINS: list[AnyHttpUrl] = ["http://localhost:3000"]
     
     # Database
@@ -27,6 +75,27 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: str = "5432"
     DATABASE_URL: Optional[str] = None
+    # Connection pool, per worker process: budget
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) against max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False
+    # "direct", "session" (PgBouncer session pooling) or "transaction"
+    # (PgBouncer transaction pooling: NullPool, no prepared-statement caching)
+    DB_POOLER_MODE: str = "direct"
+    # At startup: "check" that the database is at the Alembic head (fail fast
+    # otherwise), "create_all" tables from the models (development only) or "skip"
+    DB_SCHEMA_STARTUP_MODE: str = "check"
+    # Read replicas for read-only routes, e.g. '["postgresql+asyncpg://..."]'.
+    # Strategy: "round_robin" or "least_connections". Replicas lagging more
+    # than DB_REPLICA_MAX_LAG_SECONDS are skipped (0 disables the lag check).
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 5.0
     
     @field_validator("DATABASE_URL", mode='before')
     @classmethod
@@ -41,6 +110,10 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    # Pub/sub subscribers wait on idle channels without a socket timeout; a
+    # PING checks the connection after this many idle seconds
+    REDIS_PUBSUB_HEALTH_CHECK_INTERVAL: int = 30
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_BACKEND_URL: Optional[str] = None
     
@@ -53,6 +126,16 @@ class Settings(BaseSettings):
         redis_auth = f":{values['REDIS_PASSWORD']}@" if values["REDIS_PASSWORD"] else ""
         return f"redis://{redis_auth}{values['REDIS_HOST']}:{values['REDIS_PORT']}/{values['REDIS_DB']}"
     
+    # User cache: in-process LRU in front of Redis in front of Postgres.
+    # A Redis TTL of 0 disables the Redis tier.
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_LOCAL_MAX_SIZE: int = 10000
+    USER_CACHE_LOCAL_TTL_SECONDS: int = 30
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+    # Broadcasts cache evictions to every worker: "redis" (pub/sub) or "local"
+    CACHE_INVALIDATION_BACKEND: str = "redis"
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate:user"
+
     # Email Configuration
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
@@ -0,0 +1,120 @@
+"""
+Benchmark password hash schemes on this host and suggest cost settings.
+
+Usage:
+    python -m app.core.hash_calibration --target-ms 250 --memory-mib 64
+
+The suggested values are printed as environment variables. Deploy them and
+existing hashes are migrated on each user's next successful login.
+"""
+import argparse
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+from passlib.exc import MissingBackendError
+
+from app.core.security import build_pwd_context
+
+SAMPLE_PASSWORD = "Calibration-Password-123!"
+BCRYPT_ROUNDS_RANGE = range(10, 17)
+ARGON2_MAX_TIME_COST = 10
+ARGON2_MIN_MEMORY_KIB = 19 * 1024
+
+
+def _median_verify_ms(samples: int, **context_kwargs) -> float:
+    context = build_pwd_context(**context_kwargs)
+    hashed = context.hash(SAMPLE_PASSWORD)
+    timings: List[float] = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> Optional[Tuple[Dict[str, int], float]]:
+    """Return the highest bcrypt cost whose verify time stays under the target."""
+    best = None
+    for rounds in BCRYPT_ROUNDS_RANGE:
+        elapsed = _median_verify_ms(samples, scheme="bcrypt", bcrypt_rounds=rounds)
+        print(f"  bcrypt rounds={rounds:<2} verify={elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = ({"BCRYPT_ROUNDS": rounds}, elapsed)
+    return best
+
+
+def calibrate_argon2(
+    target_ms: float, memory_kib: int, samples: int
+) -> Optional[Tuple[Dict[str, int], float]]:
+    """Return the highest argon2 time cost that fits the target at the memory budget.
+
+    Parallelism is fixed at 1: the memory budget is per core and concurrent
+    logins already keep every core busy, so extra lanes only add contention.
+    If even time_cost=1 is too slow, memory is halved down to the OWASP floor.
+    """
+    best = None
+    while best is None and memory_kib >= ARGON2_MIN_MEMORY_KIB:
+        for time_cost in range(1, ARGON2_MAX_TIME_COST + 1):
+            elapsed = _median_verify_ms(
+                samples,
+                scheme="argon2",
+                argon2_time_cost=time_cost,
+                argon2_memory_cost=memory_kib,
+                argon2_parallelism=1,
+            )
+            print(
+                f"  argon2 m={memory_kib // 1024} MiB t={time_cost:<2} "
+                f"verify={elapsed:8.1f} ms"
+            )
+            if elapsed > target_ms:
+                break
+            best = (
+                {
+                    "ARGON2_TIME_COST": time_cost,
+                    "ARGON2_MEMORY_COST": memory_kib,
+                    "ARGON2_PARALLELISM": 1,
+                },
+                elapsed,
+            )
+        memory_kib //= 2
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="Maximum acceptable verify latency per login")
+    parser.add_argument("--memory-mib", type=int, default=64,
+                        help="Argon2 memory budget per core in MiB")
+    parser.add_argument("--samples", type=int, default=5,
+                        help="Verify calls timed per parameter set")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=None,
+                        help="Scheme to recommend (default: fastest-to-target secure choice)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print("Calibrating bcrypt...")
+    results["bcrypt"] = calibrate_bcrypt(args.target_ms, args.samples)
+    print("Calibrating argon2...")
+    try:
+        results["argon2"] = calibrate_argon2(args.target_ms, args.memory_mib * 1024, args.samples)
+    except MissingBackendError:
+        print("  argon2 backend not installed (pip install argon2-cffi), skipping")
+        results["argon2"] = None
+
+    scheme = args.scheme or ("argon2" if results["argon2"] else "bcrypt")
+    chosen = results.get(scheme)
+    if chosen is None:
+        raise SystemExit(f"No {scheme} parameters meet a {args.target_ms} ms target on this host")
+
+    params, elapsed = chosen
+    print(f"\n# {scheme} verify ~{elapsed:.1f} ms on this host")
+    print(f"PASSWORD_HASH_SCHEME={scheme}")
+    for key, value in params.items():
+        print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Shared async Redis client for caching.
+"""
+from typing import Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide Redis client, creating its connection pool lazily."""
+    global _client
+    if _client is None:
+        _client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+            db=settings.REDIS_DB,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def create_pubsub_client() -> redis.Redis:
+    """A separate client for long-lived subscriptions.
+
+    The shared client's short socket timeout suits request-path reads, but a
+    subscriber legitimately waits on an idle channel indefinitely.
+    """
+    return redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD or None,
+        db=settings.REDIS_DB,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_timeout=None,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_PUBSUB_HEALTH_CHECK_INTERVAL,
+    )
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
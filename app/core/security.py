@@ -1,30 +1,67 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import json
 import logging
+import multiprocessing
 import re
+import time
+from abc import ABC, abstractmethod
+from calendar import timegm
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+from uuid import uuid4
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from jose import JWTError, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
 from pydantic import ValidationError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from starlette.middleware.cors import CORSMiddleware
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.schemas.token import TokenData, TokenType
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(
-    schemes=["bcrypt", "argon2", "django_argon2"],
-    deprecated="auto",
-    argon2__time_cost=3,
-    argon2__memory_cost=65536,
-    argon2__parallelism=4,
-    argon2__hash_len=32,
-)
+def build_pwd_context(
+    scheme: Optional[str] = None,
+    bcrypt_rounds: Optional[int] = None,
+    argon2_time_cost: Optional[int] = None,
+    argon2_memory_cost: Optional[int] = None,
+    argon2_parallelism: Optional[int] = None,
+) -> CryptContext:
+    """Build the password context; unset parameters come from settings.
+
+    Rounds are pinned with min/max so that hashes made with older parameters
+    report ``needs_update`` in both directions (upgrade and downgrade).
+    """
+    bcrypt_rounds = bcrypt_rounds or settings.BCRYPT_ROUNDS
+    argon2_time_cost = argon2_time_cost or settings.ARGON2_TIME_COST
+    return CryptContext(
+        schemes=["bcrypt", "argon2", "django_argon2"],
+        default=scheme or settings.PASSWORD_HASH_SCHEME,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost or settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=argon2_parallelism or settings.ARGON2_PARALLELISM,
+        argon2__hash_len=32,
+    )
+
+pwd_context = build_pwd_context()
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_PREFIX}/auth/login",
@@ -56,12 +93,286 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is stale."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "Password hash/verify jobs running or queued in the hashing pool",
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent waiting for and running a password hash/verify job",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password hash/verify jobs rejected because the hashing pool was saturated",
+)
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_in_flight = 0
+
+def start_password_hasher() -> None:
+    """Create the hashing process pool (called from the app lifespan)."""
+    global _hash_executor
+    if _hash_executor is None and settings.PASSWORD_HASH_POOL_SIZE > 0:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+def shutdown_password_hasher() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True, cancel_futures=True)
+        _hash_executor = None
+
+async def _run_hash_job(operation: str, func: Callable[..., Any], *args: Any) -> Any:
+    global _hash_in_flight
+    capacity = max(settings.PASSWORD_HASH_POOL_SIZE, 1) + settings.PASSWORD_HASH_QUEUE_SIZE
+    if _hash_in_flight >= capacity:
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    start_password_hasher()
+    _hash_in_flight += 1
+    PASSWORD_HASH_IN_FLIGHT.set(_hash_in_flight)
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_in_flight -= 1
+        PASSWORD_HASH_IN_FLIGHT.set(_hash_in_flight)
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the hashing pool without blocking the event loop."""
+    return await _run_hash_job("hash", get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool without blocking the event loop."""
+    return await _run_hash_job("verify", verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Async variant of ``verify_and_update_password`` run in the hashing pool."""
+    return await _run_hash_job(
+        "verify", verify_and_update_password, plain_password, hashed_password
+    )
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+async def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """Hash a batch of passwords in parallel, preserving order.
+
+    Bulk jobs get their own short-lived pool instead of the shared one so a
+    large import never takes the admission slots that logins depend on.
+    """
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    if workers <= 0:
+        return await loop.run_in_executor(None, _hash_many, passwords)
+
+    chunk_size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    executor = ProcessPoolExecutor(
+        max_workers=len(chunks), mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _hash_many, chunk) for chunk in chunks)
+        )
+    finally:
+        # Leaving a ``with`` block would wait for running chunks on the event
+        # loop, e.g. after the client disconnected and the request was cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [hashed for chunk in results for hashed in chunk]
+
+class TokenCodec(ABC):
+    """Signs and verifies JWTs. ``decode`` raises jose's ``JWTError`` family on failure."""
+
+    name: str
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        ...
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        ...
+
+class JoseTokenCodec(TokenCodec):
+    name = "jose"
+
+    def __init__(self, key: str, algorithm: str):
+        self.key = key
+        self.algorithm = algorithm
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return jwt.encode(claims, self.key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        return jwt.decode(
+            token,
+            self.key,
+            algorithms=[self.algorithm],
+            options={"verify_aud": False},
+        )
+
+class PyJWTTokenCodec(TokenCodec):
+    """PyJWT backend; PyJWT is only imported when selected."""
+
+    name = "pyjwt"
+
+    def __init__(self, key: str, algorithm: str):
+        try:
+            import jwt as pyjwt
+        except ImportError as e:
+            raise ImportError("JWT_BACKEND='pyjwt' requires the PyJWT package (pip install PyJWT)") from e
+
+        self._jwt = pyjwt
+        self.key = key
+        self.algorithm = algorithm
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return self._jwt.encode(claims, self.key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(
+                token,
+                self.key,
+                algorithms=[self.algorithm],
+                options={"verify_aud": False},
+            )
+        except self._jwt.ExpiredSignatureError as e:
+            raise ExpiredSignatureError(str(e)) from e
+        except self._jwt.PyJWTError as e:
+            raise JWTError(str(e)) from e
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+class HS256TokenCodec(TokenCodec):
+    """Minimal HS256-only codec.
+
+    The HMAC key schedule is computed once and copied per token, the header
+    segment is a precomputed constant and claims use compact JSON. Tokens are
+    interchangeable with the other backends.
+    """
+
+    name = "hs256"
+    _header_segment = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+    def __init__(self, key: str, algorithm: str = "HS256"):
+        if algorithm != "HS256":
+            raise ValueError(f"HS256TokenCodec cannot handle {algorithm}")
+        self._mac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        payload_segment = _b64url_encode(self._encoder.encode(claims).encode())
+        signing_input = self._header_segment + b"." + payload_segment
+        return (signing_input + b"." + _b64url_encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, _, signature_segment = token.encode("ascii").rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            if header_segment != self._header_segment:
+                header = json.loads(_b64url_decode(header_segment))
+                if not isinstance(header, dict) or header.get("alg") != "HS256":
+                    raise JWTError("The specified alg value is not allowed")
+            signature = _b64url_decode(signature_segment)
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise JWTError("Invalid token") from e
+
+        if not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise JWTError("Signature verification failed.")
+
+        try:
+            claims = json.loads(_b64url_decode(payload_segment))
+        except (ValueError, binascii.Error) as e:
+            raise JWTError("Invalid payload") from e
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+
+        now = int(time.time())
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise JWTClaimsError("Expiration Time claim (exp) must be an integer.")
+            if exp < now:
+                raise ExpiredSignatureError("Signature has expired.")
+        nbf = claims.get("nbf")
+        if nbf is not None:
+            if not isinstance(nbf, (int, float)):
+                raise JWTClaimsError("Not Before claim (nbf) must be an integer.")
+            if nbf > now:
+                raise JWTClaimsError("The token is not yet valid (nbf)")
+        return claims
+
+TOKEN_CODECS: Dict[str, Type[TokenCodec]] = {
+    JoseTokenCodec.name: JoseTokenCodec,
+    PyJWTTokenCodec.name: PyJWTTokenCodec,
+    HS256TokenCodec.name: HS256TokenCodec,
+}
+
+def build_token_codec(backend: Optional[str] = None) -> TokenCodec:
+    backend = backend or settings.JWT_BACKEND
+    try:
+        codec_class = TOKEN_CODECS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown JWT_BACKEND {backend!r}, expected one of {sorted(TOKEN_CODECS)}")
+    return codec_class(settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+
+token_codec = build_token_codec()
+
+def _token_claims(
+    data: Dict[str, Any], token_type: TokenType, now: datetime, expire: datetime
+) -> Dict[str, Any]:
+    to_encode = data.copy()
+    to_encode.update(
+        {
+            "exp": timegm(expire.utctimetuple()),
+            "iat": timegm(now.utctimetuple()),
+            "type": token_type.value,
+            "iss": settings.JWT_ISSUER,
+        }
+    )
+    return to_encode
+
+def _encode_token(
+    data: Dict[str, Any], token_type: TokenType, now: datetime, expire: datetime
+) -> str:
+    return token_codec.encode(_token_claims(data, token_type, now, expire))
+
 def create_token(
     data: Dict[str, Any],
     token_type: TokenType,
     expires_delta: Optional[timedelta] = None,
 ) -> str:
-    to_encode = data.copy()
     now = datetime.utcnow()
     
     if expires_delta:
@@ -72,20 +383,17 @@ def create_token(
         else:
             expire = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update(
-        {
-            "exp": expire,
-            "iat": now,
-            "type": token_type,
-            "iss": settings.JWT_ISSUER,
-        }
-    )
-    
-    return jwt.encode(
-        to_encode,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM,
-    )
+    return _encode_token(data, token_type, now, expire)
+
+def user_token_claims(user: Any) -> Dict[str, Any]:
+    """Identity claims embedded in access tokens so requests need no user lookup."""
+    role = user.role.value if hasattr(user.role, "value") else user.role
+    return {
+        "sub": str(user.id),
+        "role": role,
+        "verified": bool(user.is_verified),
+        "tv": user.token_version or 0,
+    }
 
 def create_access_token(data: Dict[str, Any]) -> str:
     return create_token(
@@ -94,22 +402,64 @@ def create_access_token(data: Dict[str, Any]) -> str:
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
 
-def create_refresh_token(data: Dict[str, Any]) -> str:
-    return create_token(
-        data,
-        token_type=TokenType.REFRESH,
-        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+def issue_refresh_token(
+    data: Dict[str, Any], family: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Create a refresh token; returns it with the claims it carries.
+
+    The refresh-token store records tokens by their ``jti`` and ``exp``, so
+    callers pass these claims on instead of decoding the token again.
+    ``family`` (``fam``) links a token to the ones it was rotated from; a
+    login starts a new family.
+    """
+    now = datetime.utcnow()
+    expire = (now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)).replace(microsecond=0)
+    # jti keeps tokens issued to one user within the same second distinct;
+    # stored refresh tokens are unique.
+    claims = _token_claims(
+        {**data, "jti": uuid4().hex, "fam": family or uuid4().hex}, TokenType.REFRESH, now, expire
     )
+    return token_codec.encode(claims), claims
+
+def create_refresh_token(data: Dict[str, Any]) -> str:
+    return issue_refresh_token(data)[0]
+
+def refresh_token_digest(token: str) -> bytes:
+    """SHA-256 of a refresh token: what is stored and indexed instead of the JWT."""
+    return hashlib.sha256(token.encode()).digest()
+
+JWT_CACHE_HITS = Counter("jwt_cache_hits_total", "Access tokens served from the verified-JWT cache")
+JWT_CACHE_MISSES = Counter("jwt_cache_misses_total", "Access tokens that needed full JWT verification")
+
+_jwt_cache = TTLCache(settings.JWT_CACHE_MAX_SIZE, settings.JWT_CACHE_TTL_SECONDS)
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verify a JWT and return its claims, reusing earlier verifications.
+
+    Claims are cached under the SHA-256 digest of the token and never outlive
+    the token's ``exp``. Invalid tokens are not cached; ``JWTError`` propagates.
+    """
+    if not settings.JWT_CACHE_ENABLED:
+        return _decode_jwt(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _jwt_cache.get(key)
+    if payload is not None:
+        JWT_CACHE_HITS.inc()
+        return payload
+
+    JWT_CACHE_MISSES.inc()
+    payload = _decode_jwt(token)
+    exp = payload.get("exp")
+    _jwt_cache.set(key, payload, expires_at=float(exp) if exp is not None else None)
+    return payload
+
+def _decode_jwt(token: str) -> Dict[str, Any]:
+    return token_codec.decode(token)
 
 def verify_token(token: str) -> Dict[str, Any]:
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-            options={"verify_aud": False},
-        )
-        return payload
+        return token_codec.decode(token)
     except JWTError:
         raise HTTPException(status_code=400, detail="Invalid token")
 
@@ -128,12 +478,7 @@ def get_current_user(
     )
     
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-            options={"verify_aud": False},
-        )
+        payload = decode_access_token(token)
         
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -0,0 +1,178 @@
+"""
+Read-through user cache: in-process LRU, then Redis, then Postgres.
+
+Entries are compact JSON arrays of ``UserRecord`` fields. Writers must call
+``user_cache.invalidate`` after committing a change to a user row; the
+eviction is broadcast to the other workers over the invalidation bus.
+
+A reader that loaded a row just before a write committed must not put it
+back after the invalidation. In Redis each user has a generation counter
+that ``invalidate`` bumps; a fill only lands if the generation is the one
+the reader saw before loading. Locally, a fill is dropped if any eviction
+happened while it was loading.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.cache_bus import InvalidationBus, build_invalidation_bus
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models import UserRecord, load_user_record
+
+logger = logging.getLogger(__name__)
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+# KEYS: user:{id}, user_gen:{id}. ARGV: record, generation seen before the
+# load ("" if none), TTL in seconds.
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def serialize_user(user: UserRecord) -> bytes:
+    return _encoder.encode([_plain(getattr(user, field)) for field in UserRecord.__slots__]).encode()
+
+
+def deserialize_user(raw: bytes) -> UserRecord:
+    values = dict(zip(UserRecord.__slots__, json.loads(raw)))
+    for field in ("created_at", "updated_at"):
+        if values[field] is not None:
+            values[field] = datetime.fromisoformat(values[field])
+    return UserRecord(**values)
+
+
+class UserCache:
+    def __init__(
+        self,
+        local_max_size: int,
+        local_ttl: float,
+        redis_ttl: int,
+        bus: Optional[InvalidationBus] = None,
+    ):
+        self.local = TTLCache(local_max_size, local_ttl)
+        self.redis_ttl = redis_ttl
+        self.bus = bus
+        # Bumped by every local eviction; fills started before one are dropped
+        self._evictions = 0
+        self._fill_script = None
+
+    async def start(self) -> None:
+        """Subscribe to evictions from other workers (called from the app lifespan)."""
+        if self.bus is not None:
+            await self.bus.start(self.evict_local, self.reset_local)
+
+    async def stop(self) -> None:
+        if self.bus is not None:
+            await self.bus.stop()
+
+    def evict_local(self, user_ids: Iterable[int]) -> None:
+        self._evictions += 1
+        for user_id in user_ids:
+            self.local.pop(user_id)
+
+    def reset_local(self) -> None:
+        self._evictions += 1
+        self.local.clear()
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"user_gen:{user_id}"
+
+    def _script(self):
+        client = get_redis()
+        if self._fill_script is None or self._fill_script.registered_client is not client:
+            self._fill_script = client.register_script(FILL_SCRIPT)
+        return self._fill_script
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[UserRecord]:
+        """Return the cached user, loading and caching it on a miss."""
+        if not settings.USER_CACHE_ENABLED:
+            return await load_user_record(db, user_id)
+
+        cached = self.local.get(user_id)
+        if cached is not None:
+            return cached
+
+        evictions = self._evictions
+        raw = None
+        # Only fill Redis when the generation could be read along with the entry
+        generation: Optional[bytes] = None
+        fill_remote = False
+        if self.redis_ttl:
+            try:
+                raw, generation = await get_redis().mget(
+                    self._key(user_id), self._generation_key(user_id)
+                )
+                fill_remote = True
+            except (RedisError, OSError) as e:
+                logger.warning(f"User cache read from Redis failed: {e}")
+
+        if raw is None:
+            cached = await load_user_record(db, user_id)
+            if cached is None:
+                return None
+            if fill_remote:
+                await self._store_remote(user_id, serialize_user(cached), generation)
+        else:
+            cached = deserialize_user(raw)
+
+        if self._evictions == evictions:
+            self.local.set(user_id, cached)
+        return cached
+
+    async def _store_remote(self, user_id: int, raw: bytes, generation: Optional[bytes]) -> None:
+        try:
+            await self._script()(
+                keys=[self._key(user_id), self._generation_key(user_id)],
+                args=[raw, generation.decode() if generation else "", self.redis_ttl],
+            )
+        except (RedisError, OSError) as e:
+            logger.warning(f"User cache write to Redis failed: {e}")
+
+    async def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Drop users from both tiers; call after the write has committed."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        self.evict_local(user_ids)
+        if self.redis_ttl:
+            try:
+                pipe = get_redis().pipeline(transaction=True)
+                pipe.delete(*(self._key(user_id) for user_id in user_ids))
+                for user_id in user_ids:
+                    # Fails any fill that read the old generation; the counter
+                    # only has to outlive an in-flight load
+                    pipe.incr(self._generation_key(user_id))
+                    pipe.expire(self._generation_key(user_id), self.redis_ttl)
+                await pipe.execute()
+            except (RedisError, OSError) as e:
+                logger.warning(f"User cache invalidation in Redis failed: {e}")
+        if self.bus is not None:
+            await self.bus.publish(user_ids)
+
+
+user_cache = UserCache(
+    local_max_size=settings.USER_CACHE_LOCAL_MAX_SIZE,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL_SECONDS,
+    bus=build_invalidation_bus(),
+)
@@ -1,12 +1,113 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
+from app.db.metrics import InstrumentedAsyncPool, instrument_pool
+from app.db.replicas import ReplicaSet
 
 DATABASE_URL = settings.DATABASE_URL
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+POOLER_MODES = ("direct", "session", "transaction")
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+def engine_options(pooler_mode: Optional[str] = None) -> Dict[str, Any]:
+    """Pool and driver options for connecting directly or through PgBouncer.
+
+    ``direct`` and ``session`` keep an application-side pool and asyncpg's
+    prepared-statement caches. ``transaction`` hands pooling to PgBouncer:
+    a server connection is only ours for one transaction, so statements
+    prepared on it cannot be reused (or even safely named) later. It uses
+    NullPool, disables both statement caches and gives every prepared
+    statement a unique name.
+    """
+    pooler_mode = pooler_mode or settings.DB_POOLER_MODE
+    if pooler_mode == "transaction":
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+            },
+        }
+    if pooler_mode in ("direct", "session"):
+        return {
+            "poolclass": InstrumentedAsyncPool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+    raise ValueError(f"Unknown DB_POOLER_MODE {pooler_mode!r}")
+
+def build_engine(
+    url: str, name: str = "primary", pooler_mode: Optional[str] = None
+) -> AsyncEngine:
+    """Create an async engine using the pool settings; ``name`` labels its metrics."""
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_logging_name=name,
+        **engine_options(pooler_mode),
+    )
+    instrument_pool(engine.sync_engine.pool)
+    return engine
+
+engine = build_engine(DATABASE_URL)
+
+replica_set = ReplicaSet(
+    [
+        build_engine(url, name=f"replica{index}")
+        for index, url in enumerate(settings.DATABASE_REPLICA_URLS, start=1)
+    ],
+    strategy=settings.DB_REPLICA_STRATEGY,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL,
+)
+
+class RoutingSession(Session):
+    """Session that sends the reads of read-only sessions to a replica.
+
+    A read-only session (``info={"read_only": True}``) picks one replica on
+    first use and keeps it. As soon as it flushes or executes an
+    INSERT/UPDATE/DELETE it is pinned to the primary for the rest of its life,
+    so it reads its own writes. Other sessions always use the primary.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replica = None
+        self._pinned = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("read_only") and not self._pinned:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self._pinned = True
+            else:
+                if self._replica is None:
+                    self._replica = replica_set.choose()
+                if self._replica is not None:
+                    return self._replica.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
-)
\ No newline at end of file
+)
+
+# Sessions for read-only routes; identical to AsyncSessionLocal without replicas
+AsyncReadSessionLocal = sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    info={"read_only": True},
+    expire_on_commit=False,
+)
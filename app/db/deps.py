@@ -1,6 +1,11 @@
-from app.db.database import AsyncSessionLocal
+from app.db.database import AsyncReadSessionLocal, AsyncSessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_read_db() -> AsyncSession:
+    """Session for read-only routes: served by a replica when one is configured."""
+    async with AsyncReadSessionLocal() as session:
+        yield session
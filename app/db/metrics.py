@@ -0,0 +1,74 @@
+"""
+Prometheus metrics for SQLAlchemy connection pools.
+
+Gauges are refreshed from pool checkout/checkin events; checkout wait time
+and timeouts are measured around the pool's internal ``_do_get``, which is
+where a request blocks when every connection is in use.
+"""
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections in the pool",
+    ["pool"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["pool"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size (counts against max_overflow)",
+    ["pool"],
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["pool"],
+)
+
+
+def pool_name(pool: Pool) -> str:
+    return getattr(pool, "logging_name", None) or "primary"
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time and timeouts."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(pool_name(self)).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool_name(self)).observe(time.perf_counter() - started)
+
+
+def instrument_pool(pool: Pool) -> None:
+    """Keep the checked-out and overflow gauges current for ``pool``."""
+    name = pool_name(pool)
+    if not hasattr(pool, "checkedout"):
+        # NullPool and friends keep no connections to report on
+        return
+    DB_POOL_SIZE.labels(name).set(pool.size())
+
+    def _update(*_):
+        DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+    event.listen(pool, "checkout", _update)
+    event.listen(pool, "checkin", _update)
+    _update()
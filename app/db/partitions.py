@@ -0,0 +1,169 @@
+"""
+Daily range partitions of ``refresh_tokens`` by ``expires_at``.
+
+Each day gets its own partition, ``refresh_tokens_pYYYYMMDD``. Partitions are
+created ahead of the longest token lifetime. Once a partition's whole range
+has expired it is detached concurrently and then dropped, which is a
+metadata-only operation instead of deleting its rows one by one and never
+takes an ACCESS EXCLUSIVE lock on the parent. Rows outside every range land in
+``refresh_tokens_default``. That only happens if maintenance has stopped.
+"""
+import logging
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "refresh_tokens"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{8}})$")
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    match = _PARTITION_NAME.match(name)
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def _bound(day: date) -> str:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc).isoformat()
+
+
+def create_partition_sql(day: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{_bound(day)}') TO ('{_bound(day + timedelta(days=1))}')"
+    )
+
+
+def partition_days(today: date, days_ahead: Optional[int] = None) -> List[date]:
+    """Days that must have a partition: today through the furthest possible expiry."""
+    if days_ahead is None:
+        days_ahead = settings.REFRESH_TOKEN_EXPIRE_DAYS + settings.REFRESH_TOKEN_PARTITIONS_AHEAD_DAYS
+    return [today + timedelta(days=offset) for offset in range(days_ahead + 1)]
+
+
+async def existing_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return list(result.scalars())
+
+
+async def ensure_partitions(
+    conn: AsyncConnection, today: Optional[date] = None, days_ahead: Optional[int] = None
+) -> List[str]:
+    """Create any missing daily partitions; returns the names created."""
+    today = today or datetime.now(timezone.utc).date()
+    existing = set(await existing_partitions(conn))
+    created = []
+    for day in partition_days(today, days_ahead):
+        name = partition_name(day)
+        if name in existing:
+            continue
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(create_partition_sql(day)))
+        except DBAPIError as e:
+            # Fails when the default partition already holds rows for this day
+            logger.error(f"Could not create partition {name}: {e}")
+            continue
+        created.append(name)
+    return created
+
+
+async def expired_partitions(
+    conn: AsyncConnection, today: Optional[date] = None
+) -> Dict[str, Optional[bool]]:
+    """Daily partition tables whose whole range lies before today.
+
+    Maps each name to whether its detach is still pending: False while
+    attached, True after an interrupted ``DETACH ... CONCURRENTLY`` and None
+    once detached but not yet dropped.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, i.inhdetachpending FROM pg_class c "
+            "LEFT JOIN pg_inherits i "
+            "ON i.inhrelid = c.oid AND i.inhparent = CAST(:parent AS regclass) "
+            "WHERE c.relkind = 'r' AND c.relname LIKE :pattern "
+            "AND c.relnamespace = "
+            "(SELECT relnamespace FROM pg_class WHERE oid = CAST(:parent AS regclass))"
+        ),
+        {"parent": PARENT_TABLE, "pattern": f"{PARENT_TABLE}_p%"},
+    )
+    expired = {}
+    for name, pending in sorted(result.all()):
+        day = partition_day(name)
+        if day is not None and day + timedelta(days=1) <= today:
+            expired[name] = pending
+    return expired
+
+
+async def detach_expired_partitions(
+    conn: AsyncConnection, today: Optional[date] = None
+) -> List[str]:
+    """Detach expired partitions without blocking the parent; returns the names detached.
+
+    ``DETACH PARTITION ... CONCURRENTLY`` cannot run inside a transaction
+    block, so ``conn`` must be in AUTOCOMMIT mode. It waits for queries that
+    may still see the partition instead of locking them out. A detach left
+    pending by an interrupted earlier run is finalized.
+    """
+    detached = []
+    for name, pending in (await expired_partitions(conn, today)).items():
+        if pending is None:
+            continue
+        mode = "FINALIZE" if pending else "CONCURRENTLY"
+        try:
+            await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} {mode}"))
+        except DBAPIError as e:
+            logger.error(f"Could not detach partition {name}: {e}")
+            continue
+        detached.append(name)
+    return detached
+
+
+async def drop_expired_partitions(
+    conn: AsyncConnection, today: Optional[date] = None
+) -> List[str]:
+    """Drop expired partitions already detached; returns the names dropped.
+
+    Run after :func:`detach_expired_partitions`. Dropping a detached table
+    only locks that table. Partitions still attached are left for the next run.
+    """
+    dropped = []
+    for name, pending in (await expired_partitions(conn, today)).items():
+        if pending is not None:
+            continue
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        except DBAPIError as e:
+            logger.error(f"Could not drop partition {name}: {e}")
+            continue
+        dropped.append(name)
+    return dropped
+
+
+async def purge_default_partition(conn: AsyncConnection) -> int:
+    """Delete expired rows that overflowed into the default partition."""
+    result = await conn.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE expires_at < now()")
+    )
+    return result.rowcount
@@ -0,0 +1,127 @@
+"""
+Read replicas: engine selection and replication-lag monitoring.
+
+Replicas start out eligible. When a lag threshold is set, a background task
+(started from the app lifespan) polls each replica and takes it out of
+rotation while it is unreachable, disconnected from its upstream, or further
+behind than the threshold.
+"""
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.metrics import pool_name
+
+logger = logging.getLogger(__name__)
+
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag observed on a read replica (NaN when unreachable)",
+    ["pool"],
+)
+
+# NULL (ineligible) unless the WAL receiver is streaming: a replica whose
+# upstream connection dropped has replayed everything it received, so its
+# LSNs match and it would otherwise look current while falling behind.
+# Otherwise zero when it has replayed everything, so an idle primary does
+# not look like growing lag. Reading the receiver status needs pg_monitor
+# (or pg_read_all_stats) on the replica.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+STRATEGIES = ("round_robin", "least_connections")
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    # NullPool (transaction pooler mode) does not track checkouts
+    checkedout = getattr(engine.sync_engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        strategy: str = "round_robin",
+        max_lag: float = 0,
+        check_interval: float = 5.0,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown DB_REPLICA_STRATEGY {strategy!r}")
+        self.engines = engines
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._eligible = list(engines)
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def eligible(self) -> List[AsyncEngine]:
+        return list(self._eligible)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Pick a replica for a new read session; None means use the primary."""
+        eligible = self._eligible
+        if not eligible:
+            return None
+        if self.strategy == "least_connections":
+            return min(eligible, key=_checked_out)
+        return eligible[next(self._counter) % len(eligible)]
+
+    async def start(self) -> None:
+        if self.engines and self.max_lag > 0 and self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+    async def lag(self, engine: AsyncEngine) -> Optional[float]:
+        """Replication lag in seconds, or None if the replica cannot be queried or is not streaming."""
+        try:
+            async with engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        except Exception as e:
+            logger.warning(f"Replica {pool_name(engine.sync_engine.pool)} lag check failed: {e}")
+            return None
+        if lag is None:
+            logger.warning(f"Replica {pool_name(engine.sync_engine.pool)} WAL receiver is not streaming")
+            return None
+        return float(lag)
+
+    async def refresh(self) -> None:
+        eligible = []
+        for engine in self.engines:
+            lag = await self.lag(engine)
+            DB_REPLICA_LAG_SECONDS.labels(pool_name(engine.sync_engine.pool)).set(
+                float("nan") if lag is None else lag
+            )
+            if lag is not None and lag <= self.max_lag:
+                eligible.append(engine)
+        self._eligible = eligible
+
+    async def _monitor(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.check_interval)
@@ -0,0 +1,77 @@
+"""
+Schema handling at application startup.
+
+``check`` (the default) compares the database's Alembic revision with the
+migration head shipped in this build: one query, and the worker refuses to
+start on a mismatch. ``create_all`` creates missing tables from the models,
+for throwaway development databases. ``skip`` does nothing (tests manage
+their own schema).
+"""
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.partitions import ensure_partitions
+from app.models.base import Base
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+SCHEMA_STARTUP_MODES = ("check", "create_all", "skip")
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def migration_head() -> str:
+    """Head revision of the migrations in this build (parsed once per process)."""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if head is None:
+        raise SchemaVersionError(f"No migrations found in {MIGRATIONS_DIR}")
+    return head
+
+
+async def database_revision(engine: AsyncEngine) -> Optional[str]:
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    except ProgrammingError as e:
+        # No alembic_version table: never migrated
+        logger.debug(f"Could not read alembic_version: {e}")
+        return None
+
+
+async def check_schema_version(engine: AsyncEngine) -> None:
+    expected = migration_head()
+    current = await database_revision(engine)
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or '<none>'}, "
+            f"this build expects {expected}. Run `alembic upgrade head`."
+        )
+
+
+async def prepare_schema(engine: AsyncEngine, mode: Optional[str] = None) -> None:
+    mode = mode or settings.DB_SCHEMA_STARTUP_MODE
+    if mode == "check":
+        await check_schema_version(engine)
+    elif mode == "create_all":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if conn.dialect.name == "postgresql":
+                await ensure_partitions(conn)
+    elif mode != "skip":
+        raise ValueError(f"Unknown DB_SCHEMA_STARTUP_MODE {mode!r}")
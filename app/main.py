@@ -10,19 +10,29 @@ from app.api.v1.user import router as users_router
 from app.api.v1.health import router as health_router
 from app.core.config import settings
 from app.core.logging_config import *
-from app.db.database import engine
-from app.models.base import Base
+from app.core.redis import close_redis
+from app.core.security import start_password_hasher, shutdown_password_hasher
+from app.core.user_cache import user_cache
+from app.db.database import engine, replica_set
+from app.db.schema import prepare_schema
+from app.services.refresh_tokens import refresh_token_store
 from contextlib import asynccontextmanager
 
-async def create_tables():
-    """Initialize database tables (development only)."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_tables()
+    await prepare_schema(engine)
+    start_password_hasher()
+    await user_cache.start()
+    await replica_set.start()
+    await refresh_token_store.start()
     yield
+    # Writes buffered refresh tokens before the engine goes away
+    await refresh_token_store.stop()
+    await replica_set.stop()
+    await user_cache.stop()
+    shutdown_password_hasher()
+    await close_redis()
+    await replica_set.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -1,3 +1,4 @@
 from .user import User, UserRole
 from .verification_token import VerificationToken
-from .refresh_token import RefreshToken
\ No newline at end of file
+from .refresh_token import RefreshToken
+from .read_models import USER_RECORD_COLUMNS, UserRecord, load_user_record, update_user_record
\ No newline at end of file
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.user import User
+
+# Everything UserRead exposes plus token_version; never the password hash
+USER_RECORD_COLUMNS = (
+    User.id,
+    User.email,
+    User.first_name,
+    User.last_name,
+    User.is_verified,
+    User.role,
+    User.created_at,
+    User.updated_at,
+    User.token_version,
+)
+
+class UserRecord:
+    """Read-only user built from a column-projected row.
+
+    Avoids ORM instrumentation and identity-map tracking on read paths.
+    UserRead validates it via ``from_attributes``.
+    """
+    __slots__ = tuple(column.key for column in USER_RECORD_COLUMNS)
+
+    def __init__(
+        self,
+        id: int,
+        email: str,
+        first_name: Optional[str],
+        last_name: Optional[str],
+        is_verified: bool,
+        role: Any,
+        created_at: Optional[datetime],
+        updated_at: Optional[datetime],
+        token_version: int,
+    ):
+        self.id = id
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+        self.is_verified = is_verified
+        self.role = role.value if hasattr(role, "value") else role
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.token_version = token_version
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "UserRecord":
+        return cls(*row)
+
+async def load_user_record(db: AsyncSession, user_id: int) -> Optional[UserRecord]:
+    row = (await db.execute(select(*USER_RECORD_COLUMNS).where(User.id == user_id))).first()
+    return UserRecord.from_row(row) if row else None
+
+async def update_user_record(
+    db: AsyncSession, user_id: int, values: Dict[str, Any]
+) -> Optional[UserRecord]:
+    """Apply ``values`` with one ``UPDATE ... RETURNING``; None if the user is gone.
+
+    The caller commits. Values may be SQL expressions such as
+    ``User.token_version + 1``.
+    """
+    if not values:
+        return await load_user_record(db, user_id)
+    row = (await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(**values)
+        .returning(*USER_RECORD_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )).first()
+    return UserRecord.from_row(row) if row else None
@@ -1,14 +1,37 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.types import Boolean, DateTime
+from sqlalchemy import DDL, Column, Index, Integer, ForeignKey, event
+from sqlalchemy.types import Boolean, DateTime, LargeBinary, String
 from app.models.base import Base
 from sqlalchemy.sql import func
 
 class RefreshToken(Base):
+    """Refresh tokens, range-partitioned by ``expires_at`` on Postgres.
+
+    Partition maintenance lives in ``app.db.partitions``; the partition key
+    has to be part of the primary key and of every unique index.
+    """
     __tablename__ = "refresh_tokens"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
-    revoked = Column(Boolean, default=False)
\ No newline at end of file
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # SHA-256 of the JWT; the token itself is never stored
+    token_hash = Column(LargeBinary(32), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, index=True)
+    revoked = Column(Boolean, default=False)
+    # Tokens rotated from one login share a family; reusing a spent token
+    # (used_at set) revokes the whole family
+    family = Column(String(32), nullable=True, index=True)
+    used_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_token_hash", "token_hash", "expires_at", unique=True),
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
+
+event.listen(
+    RefreshToken.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS refresh_tokens_default PARTITION OF refresh_tokens DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import DDL, Column, Index, Integer, String, ForeignKey, event, text
 from app.models.base import Base
 from datetime import datetime
 from sqlalchemy.types import Boolean, DateTime
@@ -20,5 +20,37 @@ class User(Base):
     last_name = Column(String, nullable=True)
     is_verified = Column(Boolean, default=False, nullable=False)
     role = Column(SQLAlchemyEnum(UserRole, name="userrole"), default=UserRole.USER, nullable=False)
+    # Embedded in tokens as "tv"; bumping it invalidates outstanding tokens
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination: (created_at, id) ordering, optionally after an equality filter
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_is_verified_created_at_id", "is_verified", "created_at", "id"),
+        # Cleanup of stale unverified accounts
+        Index(
+            "ix_users_unverified_created_at",
+            "created_at",
+            postgresql_where=text("NOT is_verified"),
+        ),
+        # Admin search: trigram GIN indexes serve ILIKE prefix/substring matches.
+        # Postgres only; other backends fall back to scanning.
+        *(
+            Index(
+                f"ix_users_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in ("email", "first_name", "last_name")
+        ),
+    )
+
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import List, Literal, Optional
 from enum import Enum
 
 class UserRole(str, Enum):
@@ -22,12 +23,71 @@ class UserRead(UserBase):
     id: int
     is_verified: bool
     role: UserRole
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class UserFilter(BaseModel):
+    """Server-side filters for user listings."""
+    role: Optional[UserRole] = None
+    is_verified: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class UserPage(BaseModel):
+    items: List[UserRead]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
+
+class UserFileFormat(str, Enum):
+    """Serialization used by user export and bulk import."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class UserImportError(BaseModel):
+    line: int
+    error: str
+
+class UserImportResult(BaseModel):
+    received: int
+    created: int
+    duplicates: List[str] = Field(
+        default_factory=list, description="Emails skipped because they already exist"
+    )
+    errors: List[UserImportError] = Field(default_factory=list)
+    emails_queued: int = 0
+    elapsed_seconds: float
+    rows_per_second: float
+
+BULK_MAX_IDS = 10000
+
+class UserSelection(BaseModel):
+    """Targets of a bulk admin operation: explicit ids or a filter, not both."""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=BULK_MAX_IDS)
+    filter: Optional[UserFilter] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of 'ids' or 'filter'")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("Filter must set at least one field")
+        return self
+
+class BulkRoleUpdate(UserSelection):
+    role: UserRole
+
+class BulkItemResult(BaseModel):
+    id: int
+    status: Literal["ok", "not_found"]
+
+class BulkOperationResult(BaseModel):
+    affected: int
+    results: List[BulkItemResult]
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -1,90 +1,124 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from uuid import uuid4
 
+from sqlalchemy import DateTime, insert, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException
 
-from app.core.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.core.security import hash_password, verify_and_update_password_async, create_access_token, issue_refresh_token, user_token_claims, verify_token
 from app.core.email import send_email
+from app.core.user_cache import user_cache
 from app.core.config import settings
-from app.models import User, VerificationToken, RefreshToken
+from app.models import User, UserRole, VerificationToken
 from app.schemas.user import UserCreate
+from app.services.refresh_tokens import refresh_token_store, token_family
 
 logger = logging.getLogger(__name__)
 
 
+def signup_statement(user_values: Dict[str, Any], token: str, expires_at: datetime):
+    """``WITH new_user AS (INSERT ... ON CONFLICT DO NOTHING RETURNING id)``
+    feeding the verification-token insert.
+
+    Returns the new user id, or no row if the email is already registered.
+    """
+    new_user = (
+        pg_insert(User)
+        .values(**user_values)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id)
+        .cte("new_user")
+    )
+    return (
+        insert(VerificationToken)
+        .from_select(
+            ["user_id", "token", "token_type", "expires_at"],
+            select(
+                new_user.c.id,
+                literal(token),
+                literal("email_verification"),
+                literal(expires_at, DateTime(timezone=True)),
+            ),
+        )
+        .returning(VerificationToken.user_id)
+    )
+
+
 class AuthService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def register_user(self, user_data: UserCreate) -> User:
-        existing_user = (
-            await self.db.execute(select(User).where(User.email == user_data.email))
-        ).scalars().first()
-        
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        hashed_password = get_password_hash(user_data.password)
-        new_user = User(
-            email=user_data.email,
-            hashed_password=hashed_password,
-            first_name=user_data.first_name,
-            last_name=user_data.last_name,
-            is_verified=False,
-        )
-        
-        self.db.add(new_user)
-        await self.db.flush()
-        
+    async def create_pending_user(self, user_data: UserCreate) -> Tuple[int, str]:
+        """Insert an unverified user and its verification token in one statement.
+
+        Returns ``(user_id, verification_token)``. The unique email index
+        decides duplicates, so there is no check-then-insert race.
+        """
+        hashed_password = await hash_password(user_data.password)
         token = str(uuid4())
         expires = datetime.now(timezone.utc) + timedelta(minutes=15)
-        verification_token = VerificationToken(
-            user_id=new_user.id,
-            token=token,
-            expires_at=expires,
-            token_type="email_verification"
-        )
-        self.db.add(verification_token)
+        user_id = (await self.db.execute(signup_statement(
+            {
+                "email": user_data.email,
+                "hashed_password": hashed_password,
+                "first_name": user_data.first_name,
+                "last_name": user_data.last_name,
+                "role": UserRole(user_data.role.value),
+                "is_verified": False,
+            },
+            token,
+            expires,
+        ))).scalar()
+        if user_id is None:
+            await self.db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
         await self.db.commit()
-        
-        if settings.EMAIL_VERIFICATION_ENABLED:
-            try:
-                verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
-                await send_email(
-                    to_email=new_user.email,
-                    subject="Verify your email",
-                    template_name="email_verification.html",
-                    context={"verification_url": verification_url}
-                )
-            except Exception as e:
-                logger.error(f"Failed to send verification email: {e}")
-        
-        return new_user
+        return user_id, token
+
+    async def send_verification_email(self, email: str, token: str) -> None:
+        if not settings.EMAIL_VERIFICATION_ENABLED:
+            return
+        try:
+            verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
+            await send_email(
+                to_email=email,
+                subject="Verify your email",
+                template_name="email_verification.html",
+                context={"verification_url": verification_url}
+            )
+        except Exception as e:
+            logger.error(f"Failed to send verification email: {e}")
+
+    async def register_user(self, user_data: UserCreate) -> User:
+        user_id, token = await self.create_pending_user(user_data)
+        await self.send_verification_email(user_data.email, token)
+        return await self.db.get(User, user_id)
     
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         result = await self.db.execute(select(User).where(User.email == email))
         user = result.scalars().first()
         
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
             return None
+
+        verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not verified:
+            return None
+
+        # Persisted by the caller's next commit (normally create_tokens)
+        if new_hash:
+            user.hashed_password = new_hash
         
         return user
     
     async def create_tokens(self, user: User) -> dict:
-        access_token = create_access_token({"sub": str(user.id)})
-        refresh_token = create_refresh_token({"sub": str(user.id)})
-        
-        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-        db_refresh_token = RefreshToken(
-            user_id=user.id,
-            token=refresh_token,
-            expires_at=expires_at
-        )
-        self.db.add(db_refresh_token)
+        access_token = create_access_token(user_token_claims(user))
+        refresh_token, refresh_claims = issue_refresh_token({"sub": str(user.id), "tv": user.token_version})
+        await refresh_token_store.add(self.db, user.id, refresh_token, refresh_claims, defer=True)
         await self.db.commit()
         
         return {
@@ -116,19 +150,34 @@ class AuthService:
         verification_token.revoked_at = datetime.now(timezone.utc)
         
         await self.db.commit()
+        await user_cache.invalidate([user.id])
         return True
     
-    async def refresh_access_token(self, refresh_token: str) -> Optional[str]:
-        token_record = (
-            await self.db.execute(
-                select(RefreshToken)
-                .where(RefreshToken.token == refresh_token)
-                .where(RefreshToken.revoked == False)
-                .where(RefreshToken.expires_at > datetime.now(timezone.utc))
-            )
-        ).scalars().first()
-        
-        if not token_record:
+    async def rotate_refresh_token(self, refresh_token: str) -> Optional[dict]:
+        """Spend a refresh token and issue new tokens in the same family."""
+        try:
+            payload = verify_token(refresh_token)
+        except HTTPException:
             return None
-        
-        return create_access_token({"sub": str(token_record.user_id)})
+        if payload.get("type") != "refresh":
+            return None
+
+        user_id = await refresh_token_store.spend(self.db, refresh_token, payload)
+        if user_id is None:
+            return None
+
+        user = await user_cache.get(self.db, user_id)
+        if not user or payload.get("tv", 0) != user.token_version:
+            return None
+
+        new_refresh_token, refresh_claims = issue_refresh_token(
+            {"sub": str(user.id), "tv": user.token_version}, family=token_family(payload)
+        )
+        await refresh_token_store.add(self.db, user.id, new_refresh_token, refresh_claims)
+        await self.db.commit()
+
+        return {
+            "access_token": create_access_token(user_token_claims(user)),
+            "refresh_token": new_refresh_token,
+            "token_type": "bearer"
+        }
@@ -0,0 +1,406 @@
+"""
+Where issued refresh tokens are recorded and looked up.
+
+``REFRESH_TOKEN_STORE`` selects the backend:
+
+- ``postgres`` stores the SHA-256 digest of each token next to its expiry.
+  The unique index is on ``(token_hash, expires_at)``, and the expiry comes
+  from the token's ``exp`` claim, so a lookup touches one partition and
+  probes one index entry.
+- ``redis`` keeps ``refresh:{jti} -> user_id`` with the token's ``exp`` as
+  the key's expiry, so login and refresh write nothing to Postgres and
+  expired tokens need no cleanup. While Redis is unreachable tokens are
+  written to Postgres instead, and lookups that miss Redis check Postgres.
+
+Tokens are single use. ``/auth/refresh`` spends the presented token and
+issues a new one in the same family (``fam`` claim). Spending is one atomic
+step, a conditional ``UPDATE ... RETURNING`` or a Lua script, so concurrent
+refreshes need no locks of their own. Presenting a spent token again means
+it leaked: the whole family is revoked.
+
+With ``REFRESH_TOKEN_WRITE_BEHIND`` the Postgres store does not insert login
+tokens in the request's transaction. They are buffered in-process and
+written as one multi-row INSERT every few milliseconds (see
+``RefreshTokenWriteBuffer``).
+
+Revoking every token of a user is done by bumping ``users.token_version``;
+``/auth/refresh`` rejects tokens whose ``tv`` claim no longer matches.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from redis.exceptions import RedisError
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.security import refresh_token_digest
+from app.db.database import AsyncSessionLocal
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Rows written before expiries were taken from the token itself were stamped
+# a moment after the token's exp
+LEGACY_EXPIRY_SLACK = timedelta(minutes=1)
+
+# Longest wait between write-behind flush retries while the database fails
+FLUSH_MAX_BACKOFF = 5.0
+
+
+def claims_expiry(payload: Dict[str, Any]) -> datetime:
+    return datetime.fromtimestamp(int(payload["exp"]), tz=timezone.utc)
+
+
+def token_family(payload: Dict[str, Any]) -> Optional[str]:
+    """Family a rotated token inherits; tokens from before rotation start one at their jti."""
+    return payload.get("fam") or payload.get("jti")
+
+
+def refresh_token_values(user_id: int, token: str, claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of the ``refresh_tokens`` row for a newly issued token."""
+    return {
+        "user_id": user_id,
+        "token_hash": refresh_token_digest(token),
+        "expires_at": claims_expiry(claims),
+        "family": claims.get("fam"),
+        "revoked": False,
+    }
+
+
+def spend_refresh_token_statement(token: str, expires_at: datetime):
+    """Mark an unspent, live token used and return its user, in one statement."""
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == refresh_token_digest(token))
+        .where(RefreshToken.expires_at >= expires_at)
+        .where(RefreshToken.expires_at < expires_at + LEGACY_EXPIRY_SLACK)
+        .where(RefreshToken.expires_at > func.now())
+        .where(RefreshToken.used_at.is_(None))
+        .where(RefreshToken.revoked == False)
+        .values(used_at=func.now())
+        .returning(RefreshToken.user_id)
+    )
+
+
+class RefreshTokenWriteBuffer:
+    """Collects refresh-token rows from logins and inserts them in batches.
+
+    Rows are flushed as one multi-row INSERT every ``interval`` seconds, or
+    sooner once ``max_rows`` are waiting, so many logins share one commit.
+    Until then a token exists only in this process: a worker that dies loses
+    at most one interval of them, and those users have to log in again.
+
+    A batch the database rejects (e.g. a row whose user has been deleted
+    since login) is retried row by row once and the offending rows are
+    dropped. Other failures keep the rows and are retried with exponential
+    backoff; once ``max_pending`` rows are waiting ``add`` refuses new ones
+    and logins write synchronously.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_rows: int,
+        max_pending: int,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.interval = interval
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._rows: List[Dict[str, Any]] = []
+        # Digests of rows not yet committed, including the batch in flight
+        self._pending: Set[bytes] = set()
+        self._failures = 0
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Queue a row; False when the buffer is full and the caller must write it."""
+        if len(self._pending) >= self.max_pending:
+            return False
+        self._rows.append(row)
+        self._pending.add(row["token_hash"])
+        if len(self._rows) >= self.max_rows:
+            self._full.set()
+        return True
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        async with self.session_factory() as session:
+            for start in range(0, len(rows), self.max_rows):
+                await session.execute(
+                    insert(RefreshToken).values(rows[start:start + self.max_rows])
+                )
+            await session.commit()
+
+    async def _insert_each(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows one savepoint at a time, dropping those the database rejects."""
+        written = 0
+        async with self.session_factory() as session:
+            for row in rows:
+                try:
+                    async with session.begin_nested():
+                        await session.execute(insert(RefreshToken).values(row))
+                except (IntegrityError, DataError) as e:
+                    logger.error(f"Dropping refresh token of user {row['user_id']}: {e.orig}")
+                    continue
+                written += 1
+            await session.commit()
+        return written
+
+    async def flush(self) -> int:
+        """Insert every queued row; returns how many were written."""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                try:
+                    await self._insert(rows)
+                    written = len(rows)
+                except (IntegrityError, DataError) as e:
+                    logger.error(
+                        f"Refresh token batch of {len(rows)} rows rejected, retrying row by row: {e.orig}"
+                    )
+                    written = await self._insert_each(rows)
+            except asyncio.CancelledError:
+                self._rows[:0] = rows
+                raise
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"Refresh token flush of {len(rows)} rows failed: {e}")
+                self._rows[:0] = rows
+                return 0
+            self._failures = 0
+            # Dropped rows are no longer pending either
+            self._pending.difference_update(row["token_hash"] for row in rows)
+            return written
+
+    def retry_delay(self) -> float:
+        """Seconds until the next flush: the interval, backing off after failures."""
+        return min(self.interval * 2 ** self._failures, FLUSH_MAX_BACKOFF)
+
+    async def flush_pending(self, token_hash: bytes) -> None:
+        """Make sure a buffered token is in the table before it is looked up."""
+        if token_hash in self._pending:
+            await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            if self._failures:
+                # A full buffer must not cut the backoff short
+                await asyncio.sleep(self.retry_delay())
+            else:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class RefreshTokenStore:
+    """Records issued refresh tokens; ``claims`` are the token's decoded claims."""
+
+    async def start(self) -> None:
+        """Called from the app lifespan."""
+
+    async def stop(self) -> None:
+        """Called from the app lifespan; must persist anything still buffered."""
+
+    async def add(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        token: str,
+        claims: Dict[str, Any],
+        defer: bool = False,
+    ) -> None:
+        """Record a new token. Writes to ``db`` are committed by the caller.
+
+        ``defer`` allows the write to be batched with other logins' instead
+        of going into ``db``'s transaction.
+        """
+        raise NotImplementedError
+
+    async def spend(self, db: AsyncSession, token: str, claims: Dict[str, Any]) -> Optional[int]:
+        """Use up a live token and return the id of the user it was issued to.
+
+        Returns None for unknown, expired, revoked or already spent tokens;
+        a spent one also gets its family revoked. Marking the token used is
+        committed by the caller, together with its replacement.
+        """
+        raise NotImplementedError
+
+
+class PostgresRefreshTokenStore(RefreshTokenStore):
+    def __init__(self, buffer: Optional[RefreshTokenWriteBuffer] = None):
+        self.buffer = buffer
+
+    async def start(self) -> None:
+        if self.buffer is not None:
+            await self.buffer.start()
+
+    async def stop(self) -> None:
+        if self.buffer is not None:
+            await self.buffer.stop()
+
+    async def add(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        token: str,
+        claims: Dict[str, Any],
+        defer: bool = False,
+    ) -> None:
+        values = refresh_token_values(user_id, token, claims)
+        if defer and self.buffer is not None and self.buffer.add(values):
+            return
+        db.add(RefreshToken(**values))
+
+    async def spend(self, db: AsyncSession, token: str, claims: Dict[str, Any]) -> Optional[int]:
+        if self.buffer is not None:
+            await self.buffer.flush_pending(refresh_token_digest(token))
+        user_id = (await db.execute(
+            spend_refresh_token_statement(token, claims_expiry(claims))
+        )).scalar()
+        if user_id is None:
+            await self._revoke_family(db, token_family(claims))
+        return user_id
+
+    @staticmethod
+    async def _revoke_family(db: AsyncSession, family: Optional[str]) -> None:
+        if family is None:
+            return
+        result = await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family == family)
+            .where(RefreshToken.revoked == False)
+            .values(revoked=True)
+        )
+        # The request fails, so nothing else commits this
+        await db.commit()
+        if result.rowcount:
+            logger.warning(
+                f"Refresh token reuse: revoked {result.rowcount} tokens of family {family}"
+            )
+
+
+# KEYS: refresh:{jti}, refresh_family:{fam}. ARGV: expiry of the revocation.
+# Spent tokens keep their key with the user id negated until they expire.
+SPEND_SCRIPT = """
+local user_id = redis.call('GET', KEYS[1])
+if not user_id then
+    return false
+end
+if string.sub(user_id, 1, 1) == '-' or redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SET', KEYS[2], '1', 'EXAT', ARGV[1])
+    return -1
+end
+redis.call('SET', KEYS[1], '-' .. user_id, 'KEEPTTL')
+return tonumber(user_id)
+"""
+
+
+class RedisRefreshTokenStore(RefreshTokenStore):
+    def __init__(self, fallback: RefreshTokenStore):
+        self.fallback = fallback
+        self._spend_script = None
+
+    @staticmethod
+    def _key(jti: str) -> str:
+        return f"refresh:{jti}"
+
+    @staticmethod
+    def _family_key(family: str) -> str:
+        return f"refresh_family:{family}"
+
+    def _script(self):
+        client = get_redis()
+        if self._spend_script is None or self._spend_script.registered_client is not client:
+            self._spend_script = client.register_script(SPEND_SCRIPT)
+        return self._spend_script
+
+    async def start(self) -> None:
+        await self.fallback.start()
+
+    async def stop(self) -> None:
+        await self.fallback.stop()
+
+    async def add(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        token: str,
+        claims: Dict[str, Any],
+        defer: bool = False,
+    ) -> None:
+        try:
+            await get_redis().set(self._key(claims["jti"]), user_id, exat=int(claims["exp"]))
+            return
+        except (RedisError, OSError) as e:
+            logger.warning(f"Refresh token write to Redis failed, storing it in Postgres: {e}")
+        await self.fallback.add(db, user_id, token, claims, defer=defer)
+
+    async def spend(self, db: AsyncSession, token: str, claims: Dict[str, Any]) -> Optional[int]:
+        jti, family = claims.get("jti"), token_family(claims)
+        if jti and family:
+            # A revoked family outlives every token issued into it so far
+            revoked_until = int(time.time()) + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+            try:
+                user_id = await self._script()(
+                    keys=[self._key(jti), self._family_key(family)], args=[revoked_until]
+                )
+            except (RedisError, OSError) as e:
+                logger.warning(f"Refresh token rotation in Redis failed: {e}")
+            else:
+                if user_id == -1:
+                    logger.warning(f"Refresh token reuse: revoked family {family}")
+                    return None
+                if user_id is not None:
+                    return int(user_id)
+        # Issued while Redis was down, or before the store was switched
+        return await self.fallback.spend(db, token, claims)
+
+
+def build_refresh_token_store() -> RefreshTokenStore:
+    buffer = None
+    if settings.REFRESH_TOKEN_WRITE_BEHIND:
+        buffer = RefreshTokenWriteBuffer(
+            interval=settings.REFRESH_TOKEN_FLUSH_INTERVAL_MS / 1000,
+            max_rows=settings.REFRESH_TOKEN_FLUSH_ROWS,
+            max_pending=settings.REFRESH_TOKEN_MAX_PENDING,
+        )
+    if settings.REFRESH_TOKEN_STORE == "postgres":
+        return PostgresRefreshTokenStore(buffer)
+    if settings.REFRESH_TOKEN_STORE == "redis":
+        return RedisRefreshTokenStore(fallback=PostgresRefreshTokenStore(buffer))
+    raise ValueError(f"Unknown REFRESH_TOKEN_STORE {settings.REFRESH_TOKEN_STORE!r}")
+
+
+refresh_token_store = build_refresh_token_store()
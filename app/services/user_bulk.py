@@ -0,0 +1,128 @@
+"""
+Set-based admin operations over many users at once.
+
+Each operation runs a fixed number of statements regardless of how many
+users it touches, then invalidates the user cache in a single call. A
+selection may match at most ``BULK_MAX_ROWS`` users so one request never
+holds row locks on, or invalidates, an unbounded part of the table.
+"""
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, and_, any_, bindparam, delete, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.models import RefreshToken, User, UserRole, VerificationToken
+from app.schemas.user import UserSelection
+from app.services.users import user_filter_conditions
+
+
+def ids_condition(column, ids: List[int]):
+    """``column = ANY(:ids)``: one array parameter however many ids there are."""
+    return column == any_(bindparam(None, list(ids), type_=ARRAY(Integer)))
+
+
+def selection_condition(selection: UserSelection):
+    if selection.ids is not None:
+        return ids_condition(User.id, selection.ids)
+    return and_(*user_filter_conditions(selection.filter))
+
+
+def bulk_results(selection: UserSelection, affected: List[int]) -> Dict[str, Any]:
+    """Per-id outcome: requested ids report ok/not_found, filters list what matched."""
+    if selection.ids is None:
+        results = [{"id": user_id, "status": "ok"} for user_id in sorted(affected)]
+    else:
+        found = set(affected)
+        results = [
+            {"id": user_id, "status": "ok" if user_id in found else "not_found"}
+            for user_id in dict.fromkeys(selection.ids)
+        ]
+    return {"affected": len(affected), "results": results}
+
+
+async def lock_targets(db: AsyncSession, selection: UserSelection) -> List[int]:
+    """Lock and return the selected user ids, or 422 if more than ``BULK_MAX_ROWS`` match."""
+    limit = settings.BULK_MAX_ROWS
+    targets = list((await db.execute(
+        select(User.id)
+        .where(selection_condition(selection))
+        .order_by(User.id)
+        .limit(limit + 1)
+        .with_for_update()
+    )).scalars())
+    if len(targets) > limit:
+        await db.rollback()
+        raise HTTPException(
+            status_code=422,
+            detail=f"Selection matches more than {limit} users; narrow the filter",
+        )
+    return targets
+
+
+async def _revoke_refresh_tokens(db: AsyncSession, user_ids: List[int]) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(ids_condition(RefreshToken.user_id, user_ids))
+        .where(RefreshToken.revoked == False)
+        .values(revoked=True)
+    )
+
+
+async def bulk_change_role(db: AsyncSession, selection: UserSelection, role) -> Dict[str, Any]:
+    targets = await lock_targets(db, selection)
+    affected = list((await db.execute(
+        update(User)
+        .where(ids_condition(User.id, targets))
+        # Outstanding tokens carry the old role
+        .values(role=UserRole(role.value), token_version=User.token_version + 1)
+        .returning(User.id)
+    )).scalars())
+    if affected:
+        await _revoke_refresh_tokens(db, affected)
+    await db.commit()
+    await user_cache.invalidate(affected)
+    return bulk_results(selection, affected)
+
+
+async def bulk_verify(db: AsyncSession, selection: UserSelection) -> Dict[str, Any]:
+    targets = await lock_targets(db, selection)
+    affected = list((await db.execute(
+        update(User)
+        .where(ids_condition(User.id, targets))
+        .values(is_verified=True)
+        .returning(User.id)
+    )).scalars())
+    if affected:
+        # Pending verification links are no longer needed
+        await db.execute(
+            update(VerificationToken)
+            .where(ids_condition(VerificationToken.user_id, affected))
+            .where(VerificationToken.token_type == "email_verification")
+            .where(VerificationToken.revoked == False)
+            .values(revoked=True)
+        )
+    await db.commit()
+    await user_cache.invalidate(affected)
+    return bulk_results(selection, affected)
+
+
+async def bulk_delete(db: AsyncSession, selection: UserSelection) -> Dict[str, Any]:
+    # Their token rows must go before the users (FK)
+    targets = await lock_targets(db, selection)
+    affected: List[int] = []
+    if targets:
+        await db.execute(delete(RefreshToken).where(ids_condition(RefreshToken.user_id, targets)))
+        await db.execute(
+            delete(VerificationToken).where(ids_condition(VerificationToken.user_id, targets))
+        )
+        affected = list((await db.execute(
+            delete(User).where(ids_condition(User.id, targets)).returning(User.id)
+        )).scalars())
+    await db.commit()
+    await user_cache.invalidate(affected)
+    return bulk_results(selection, affected)
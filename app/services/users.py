@@ -0,0 +1,86 @@
+"""
+Query helpers for user listings: filters, keyset cursors and search.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, or_
+from sqlalchemy.future import select
+from sqlalchemy.sql import Select
+
+from app.models import USER_RECORD_COLUMNS, User, UserRole
+from app.schemas.user import UserFilter
+
+
+def user_filter_conditions(filters: UserFilter) -> List[Any]:
+    """Translate a UserFilter into SQL conditions on the users table."""
+    conditions = []
+    if filters.role is not None:
+        conditions.append(User.role == UserRole(filters.role.value))
+    if filters.is_verified is not None:
+        conditions.append(User.is_verified == filters.is_verified)
+    if filters.created_after is not None:
+        conditions.append(User.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(User.created_at < filters.created_before)
+    return conditions
+
+
+def encode_cursor(created_at: datetime, user_id: int) -> str:
+    """Opaque keyset cursor pointing just past (created_at, id)."""
+    raw = json.dumps([created_at.isoformat(), user_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+SEARCH_COLUMNS = (User.email, User.first_name, User.last_name)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def user_search_query(q: str, limit: int, dialect_name: str) -> Select:
+    """Case-insensitive prefix/substring search over email and names.
+
+    Ranking: exact email match, then prefix matches, then substring matches.
+    On Postgres, ties are broken by pg_trgm similarity and every ILIKE is
+    served by the trigram GIN indexes on the users table.
+    """
+    q = q.strip()
+    term = _escape_like(q)
+    substring = f"%{term}%"
+    prefix = f"{term}%"
+
+    rank = case(
+        (func.lower(User.email) == q.lower(), 0),
+        (or_(*(column.ilike(prefix, escape="\\") for column in SEARCH_COLUMNS)), 1),
+        else_=2,
+    )
+    order_by = [rank]
+    if dialect_name == "postgresql":
+        order_by.append(
+            func.greatest(
+                *(func.similarity(func.coalesce(column, ""), q) for column in SEARCH_COLUMNS)
+            ).desc()
+        )
+    order_by.append(User.id)
+
+    return (
+        select(*USER_RECORD_COLUMNS)
+        .where(or_(*(column.ilike(substring, escape="\\") for column in SEARCH_COLUMNS)))
+        .order_by(*order_by)
+        .limit(limit)
+    )
@@ -1,13 +1,22 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from sqlalchemy import select, and_
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from app.core.celery import celery_app
 from app.core.config import settings
+from app.db.database import engine_options
 from app.db.deps import get_db
+from app.db.partitions import (
+    detach_expired_partitions,
+    drop_expired_partitions,
+    ensure_partitions,
+    purge_default_partition,
+)
 from app.models import User, RefreshToken, VerificationToken
 
 logger = logging.getLogger(__name__)
@@ -112,6 +121,53 @@ async def cleanup_expired_tokens(self):
         logger.error(f"Error cleaning up expired tokens: {e}")
         raise self.retry(exc=e, countdown=60 * 5)
 
+async def _maintain_refresh_token_partitions() -> Dict[str, Any]:
+    # A throwaway engine: pooled asyncpg connections cannot outlive asyncio.run's loop.
+    # Behind PgBouncer in transaction mode it needs the same driver options as the app.
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args=engine_options().get("connect_args", {}),
+    )
+    try:
+        async with engine.begin() as conn:
+            created = await ensure_partitions(conn)
+            purged = await purge_default_partition(conn)
+        # DETACH ... CONCURRENTLY refuses to run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await detach_expired_partitions(conn)
+        # Only detached tables are dropped; don't queue behind long queries
+        async with engine.begin() as conn:
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            dropped = await drop_expired_partitions(conn)
+    finally:
+        await engine.dispose()
+    return {"created": created, "dropped": dropped, "purged_default_rows": purged}
+
+@celery_app.task(
+    bind=True,
+    name="cleanup.refresh_token_partitions",
+    max_retries=3,
+    default_retry_delay=300,
+    soft_time_limit=300,
+    time_limit=360,
+    acks_late=True,
+)
+def maintain_refresh_token_partitions(self):
+    """Pre-create upcoming refresh_tokens partitions and drop fully expired ones."""
+    try:
+        result = asyncio.run(_maintain_refresh_token_partitions())
+    except Exception as e:
+        logger.error(f"Error maintaining refresh token partitions: {e}")
+        raise self.retry(exc=e, countdown=60 * 5)
+
+    logger.info(
+        f"Refresh token partitions: created {len(result['created'])}, "
+        f"dropped {len(result['dropped'])}, purged {result['purged_default_rows']} default rows"
+    )
+    return {"status": "success", **result}
+
 def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(
         schedule=timedelta(hours=24).total_seconds(),
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from app.core.celery import celery_app
+from app.core.config import settings
+from app.core.email import send_email
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.email.send_verification_emails",
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+)
+def send_verification_emails(self, recipients: List[Dict[str, str]]):
+    """Send verification emails for a batch of ``{"email", "token"}`` entries."""
+
+    async def _send_batch() -> int:
+        sent = 0
+        for recipient in recipients:
+            verification_url = f"{settings.FRONTEND_URL}/verify-email?token={recipient['token']}"
+            if await send_email(
+                to_email=recipient["email"],
+                subject="Verify your email",
+                template_name="email_verification.html",
+                context={"verification_url": verification_url},
+            ):
+                sent += 1
+        return sent
+
+    sent = asyncio.run(_send_batch())
+    logger.info(f"Sent {sent}/{len(recipients)} verification emails")
+    return {"status": "success", "sent": sent, "failed": len(recipients) - sent}
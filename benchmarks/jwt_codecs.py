@@ -0,0 +1,54 @@
+"""
+Micro-benchmark for the JWT codec backends in app.core.security.
+
+Usage:
+    python benchmarks/jwt_codecs.py [--iterations 20000]
+
+Reports encode/decode operations per second for every backend that can be
+constructed here (PyJWT is skipped when not installed). Pick the fastest one
+that passes tests/test_token_codecs.py and set JWT_BACKEND accordingly.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.security import TOKEN_CODECS, build_token_codec  # noqa: E402
+
+CLAIMS = {
+    "sub": "12345",
+    "role": "USER",
+    "scopes": ["user:read", "user:write"],
+    "exp": 4102444800,
+    "iat": 1700000000,
+    "type": "access",
+    "iss": "Coffee Shop API",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JWT codec backends")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'encode/s':>12} {'decode/s':>12}")
+    for name in TOKEN_CODECS:
+        try:
+            codec = build_token_codec(name)
+        except (ImportError, ValueError) as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+
+        token = codec.encode(CLAIMS)
+        encode_s = timeit.timeit(lambda: codec.encode(CLAIMS), number=args.iterations)
+        decode_s = timeit.timeit(lambda: codec.decode(token), number=args.iterations)
+        print(
+            f"{name:<8} {args.iterations / encode_s:>12,.0f} "
+            f"{args.iterations / decode_s:>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
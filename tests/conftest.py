@@ -14,10 +14,16 @@ os.environ["ENVIRONMENT"] = "test"
 os.environ["POSTGRES_DB"] = "test_coffee_shop"
 os.environ["POSTGRES_HOST"] = "localhost"
 os.environ["POSTGRES_PORT"] = "5432"
+os.environ["PASSWORD_HASH_POOL_SIZE"] = "0"
+os.environ["USER_CACHE_REDIS_TTL_SECONDS"] = "0"
+os.environ["CACHE_INVALIDATION_BACKEND"] = "local"
+os.environ["DB_SCHEMA_STARTUP_MODE"] = "skip"
 
 from app.core.config import settings
+from app.core.security import create_access_token, user_token_claims
+from app.models import User, UserRole
 from app.models.base import Base
-from app.db.deps import get_db
+from app.db.deps import get_db, get_read_db
 from app.main import app as _app
 
 # Use a test database
@@ -96,6 +102,7 @@ async def client(db_session) -> Generator[TestClient, None, None]:
             pass
     
     _app.dependency_overrides[get_db] = override_get_db
+    _app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(_app) as test_client:
         yield test_client
@@ -117,3 +124,24 @@ def test_user():
         "first_name": "Test",
         "last_name": "User"
     }
+
+@pytest.fixture
+async def admin_user(db_session) -> User:
+    """A verified admin stored in the test database."""
+    user = User(
+        email="admin@example.com",
+        hashed_password="not-a-real-hash",
+        first_name="Admin",
+        last_name="User",
+        is_verified=True,
+        role=UserRole.ADMIN,
+    )
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+@pytest.fixture
+def admin_headers(admin_user) -> dict:
+    """Bearer headers carrying ``admin_user``'s current claims."""
+    token = create_access_token(user_token_claims(admin_user))
+    return {"Authorization": f"Bearer {token}"}
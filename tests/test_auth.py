@@ -225,3 +225,20 @@ async def test_read_users_me(client, db_session: AsyncSession):
     # Test without token
     response = client.get("/api/v1/users/me")
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_signup_is_a_single_statement():
+    from sqlalchemy.dialects import postgresql
+
+    from app.services.auth import signup_statement
+
+    statement = signup_statement(
+        {"email": TEST_EMAIL, "hashed_password": "x", "is_verified": False},
+        "token",
+        datetime.utcnow() + timedelta(minutes=15),
+    )
+    sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+    assert sql.startswith("WITH new_user AS (INSERT INTO users")
+    assert "ON CONFLICT (email) DO NOTHING RETURNING users.id" in sql
+    assert "INSERT INTO verification_tokens" in sql
+    assert "SELECT new_user.id" in sql
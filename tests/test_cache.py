@@ -0,0 +1,64 @@
+"""
+Tests for in-process caches.
+"""
+import time
+from datetime import timedelta
+
+import pytest
+from jose import JWTError
+
+from app.core import security
+from app.core.cache import TTLCache
+from app.core.security import create_access_token, create_token, decode_access_token
+from app.schemas.token import TokenType
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_respects_entry_deadline():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("expired", 1, expires_at=time.time() - 1)
+    cache.set("live", 2, expires_at=time.time() + 60)
+    assert cache.get("expired") is None
+    assert cache.get("live") == 2
+    assert len(cache) == 1
+
+
+def test_decode_access_token_uses_cache(monkeypatch):
+    """A repeated token is served from the cache without re-verifying the signature."""
+    security._jwt_cache.clear()
+    token = create_access_token({"sub": "42"})
+    calls = []
+    original = security._decode_jwt
+
+    def counting_decode(value):
+        calls.append(value)
+        return original(value)
+
+    monkeypatch.setattr(security, "_decode_jwt", counting_decode)
+    hits = security.JWT_CACHE_HITS._value.get()
+
+    assert decode_access_token(token)["sub"] == "42"
+    assert decode_access_token(token)["sub"] == "42"
+    assert len(calls) == 1
+    assert security.JWT_CACHE_HITS._value.get() == hits + 1
+
+
+def test_decode_access_token_does_not_cache_invalid_tokens():
+    security._jwt_cache.clear()
+    expired = create_token(
+        {"sub": "42"}, token_type=TokenType.ACCESS, expires_delta=timedelta(seconds=-1)
+    )
+    for token in ("invalidtoken", expired):
+        with pytest.raises(JWTError):
+            decode_access_token(token)
+    assert len(security._jwt_cache) == 0
@@ -0,0 +1,15 @@
+"""
+Tests for Celery task registration and scheduling.
+"""
+from app.core.celery import celery_app
+
+
+def test_task_modules_are_registered():
+    celery_app.loader.import_default_modules()
+    assert "cleanup.refresh_token_partitions" in celery_app.tasks
+    assert "app.tasks.email.send_verification_emails" in celery_app.tasks
+
+
+def test_partition_maintenance_is_scheduled():
+    scheduled = {entry["task"] for entry in celery_app.conf.beat_schedule.values()}
+    assert "cleanup.refresh_token_partitions" in scheduled
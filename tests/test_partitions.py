@@ -0,0 +1,96 @@
+"""
+Tests for refresh_tokens partition naming and maintenance planning.
+"""
+from contextlib import asynccontextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.core.config import settings
+from app.db.partitions import (
+    create_partition_sql,
+    detach_expired_partitions,
+    drop_expired_partitions,
+    partition_day,
+    partition_days,
+    partition_name,
+)
+from app.models import RefreshToken
+
+
+def test_partition_name_roundtrip():
+    day = date(2026, 10, 15)
+    assert partition_name(day) == "refresh_tokens_p20261015"
+    assert partition_day("refresh_tokens_p20261015") == day
+    assert partition_day("refresh_tokens_default") is None
+
+
+def test_partition_covers_one_utc_day():
+    sql = create_partition_sql(date(2026, 12, 31))
+    assert "PARTITION OF refresh_tokens" in sql
+    assert "FROM ('2026-12-31T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')" in sql
+
+
+def test_partitions_cover_longest_token_lifetime():
+    today = date(2026, 10, 15)
+    days = partition_days(today)
+    assert days[0] == today
+    expected = settings.REFRESH_TOKEN_EXPIRE_DAYS + settings.REFRESH_TOKEN_PARTITIONS_AHEAD_DAYS + 1
+    assert len(days) == expected
+
+
+def test_refresh_tokens_table_is_range_partitioned():
+    ddl = str(CreateTable(RefreshToken.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (expires_at)" in ddl
+    assert "PRIMARY KEY (id, expires_at)" in ddl
+
+
+class CatalogConnection:
+    """Answers the expired-partition lookup from ``tables`` (name -> inhdetachpending)."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT"):
+            rows = list(self.tables.items())
+            return type("Result", (), {"all": lambda self: rows})()
+        self.statements.append(sql)
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+
+TODAY = date(2026, 10, 15)
+TABLES = {
+    "refresh_tokens_p20261013": False,  # attached
+    "refresh_tokens_p20261012": True,  # interrupted concurrent detach
+    "refresh_tokens_p20261011": None,  # detached, not yet dropped
+    "refresh_tokens_p20261015": False,  # today: still live
+    "refresh_tokens_default": False,
+}
+
+
+@pytest.mark.asyncio
+async def test_expired_partitions_detached_concurrently():
+    conn = CatalogConnection(TABLES)
+    assert await detach_expired_partitions(conn, TODAY) == [
+        "refresh_tokens_p20261012",
+        "refresh_tokens_p20261013",
+    ]
+    assert conn.statements == [
+        "ALTER TABLE refresh_tokens DETACH PARTITION refresh_tokens_p20261012 FINALIZE",
+        "ALTER TABLE refresh_tokens DETACH PARTITION refresh_tokens_p20261013 CONCURRENTLY",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_only_detached_partitions_dropped():
+    conn = CatalogConnection(TABLES)
+    assert await drop_expired_partitions(conn, TODAY) == ["refresh_tokens_p20261011"]
+    assert conn.statements == ["DROP TABLE IF EXISTS refresh_tokens_p20261011"]
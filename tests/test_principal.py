@@ -0,0 +1,87 @@
+"""
+Tests for the stateless principal dependency.
+"""
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import auth
+from app.core.auth import get_current_principal, get_unrevoked_principal, require_admin
+from app.core.user_cache import user_cache
+from app.core.security import create_access_token, create_refresh_token, user_token_claims
+from app.models import UserRole
+
+
+def _user(role=UserRole.USER, token_version=0):
+    return SimpleNamespace(id=7, role=role, is_verified=True, token_version=token_version)
+
+
+@pytest.mark.asyncio
+async def test_principal_built_from_claims():
+    token = create_access_token(user_token_claims(_user(UserRole.ADMIN, token_version=3)))
+    principal = await get_current_principal(token)
+    assert principal.id == 7
+    assert principal.is_admin
+    assert principal.is_verified
+    assert principal.token_version == 3
+    assert await require_admin(principal) is principal
+
+
+@pytest.mark.asyncio
+async def test_non_admin_principal_rejected_by_require_admin():
+    principal = await get_current_principal(create_access_token(user_token_claims(_user())))
+    with pytest.raises(HTTPException) as exc_info:
+        await require_admin(principal)
+    assert exc_info.value.status_code == 403
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "token",
+    [
+        create_refresh_token({"sub": "7", "tv": 0}),
+        create_access_token({"sub": "7"}),
+        "invalidtoken",
+    ],
+)
+async def test_principal_rejects_unusable_tokens(token):
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_principal(token)
+    assert exc_info.value.status_code == 401
+
+
+class FixedUserCache:
+    def __init__(self, user):
+        self.user = user
+
+    async def get(self, db, user_id):
+        return self.user
+
+
+@pytest.mark.asyncio
+async def test_revoked_principal_rejected(monkeypatch):
+    """A token issued before a role change or password reset no longer passes."""
+    principal = await get_current_principal(
+        create_access_token(user_token_claims(_user(UserRole.ADMIN, token_version=3)))
+    )
+    monkeypatch.setattr(auth, "user_cache", FixedUserCache(_user(UserRole.USER, token_version=4)))
+    with pytest.raises(HTTPException) as exc_info:
+        await get_unrevoked_principal(principal, db=None)
+    assert exc_info.value.status_code == 401
+
+    monkeypatch.setattr(auth, "user_cache", FixedUserCache(_user(UserRole.ADMIN, token_version=3)))
+    assert await get_unrevoked_principal(principal, db=None) is principal
+
+
+@pytest.mark.asyncio
+async def test_demoted_admin_token_rejected_by_admin_route(client, db_session, admin_user, admin_headers):
+    assert client.get("/api/v1/users/", headers=admin_headers).status_code == 200
+
+    admin_user.role = UserRole.USER
+    admin_user.token_version += 1
+    await db_session.commit()
+    await user_cache.invalidate([admin_user.id])
+
+    response = client.get("/api/v1/users/", headers=admin_headers)
+    assert response.status_code == 401
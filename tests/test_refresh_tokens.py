@@ -0,0 +1,306 @@
+"""
+Tests for refresh-token storage in app.services.refresh_tokens.
+"""
+import hashlib
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.core.security import issue_refresh_token, refresh_token_digest, verify_token
+from app.models import RefreshToken
+from app.services import refresh_tokens
+from app.services.refresh_tokens import (
+    PostgresRefreshTokenStore,
+    RedisRefreshTokenStore,
+    RefreshTokenStore,
+    RefreshTokenWriteBuffer,
+    claims_expiry,
+    refresh_token_values,
+    token_family,
+)
+
+
+class RecordingSession:
+    def __init__(self, user_id=None, rowcount=0):
+        self.user_id = user_id
+        self.rowcount = rowcount
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def scalar(self):
+        return self.user_id
+
+    async def commit(self):
+        self.commits += 1
+
+
+def compile_pg(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def test_stored_expiry_matches_the_exp_claim():
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+    assert verify_token(token) == claims
+    expires_at = claims_expiry(claims)
+
+    row = RefreshToken(**refresh_token_values(7, token, claims))
+    assert row.token_hash == hashlib.sha256(token.encode()).digest()
+    assert len(row.token_hash) == 32
+    assert row.expires_at == expires_at
+    assert row.family == claims["fam"]
+
+
+def test_rotated_tokens_stay_in_their_family():
+    _, claims = issue_refresh_token({"sub": "7", "tv": 0})
+    _, rotated = issue_refresh_token({"sub": "7", "tv": 0}, family=token_family(claims))
+    assert rotated["fam"] == claims["fam"]
+    assert rotated["jti"] != claims["jti"]
+    # Tokens issued before families existed start one at their jti
+    assert token_family({"jti": "abc"}) == "abc"
+
+
+@pytest.mark.asyncio
+async def test_spend_is_one_conditional_update():
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+    db = RecordingSession(user_id=7)
+    assert await PostgresRefreshTokenStore().spend(db, token, claims) == 7
+
+    (statement,) = db.statements
+    compiled = compile_pg(statement)
+    sql = str(compiled)
+    assert sql.startswith("UPDATE refresh_tokens SET used_at=now()")
+    assert "refresh_tokens.token_hash = " in sql
+    assert "refresh_tokens.expires_at >= " in sql
+    assert "refresh_tokens.expires_at < " in sql
+    assert "refresh_tokens.used_at IS NULL" in sql
+    assert sql.endswith("RETURNING refresh_tokens.user_id")
+    assert token not in compiled.params.values()
+    assert refresh_token_digest(token) in compiled.params.values()
+    # Committed by the caller, together with the replacement token
+    assert db.commits == 0
+
+
+@pytest.mark.asyncio
+async def test_spending_a_spent_token_revokes_its_family():
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+    db = RecordingSession(user_id=None, rowcount=2)
+    assert await PostgresRefreshTokenStore().spend(db, token, claims) is None
+
+    _, revoke = db.statements
+    compiled = compile_pg(revoke)
+    assert str(compiled).startswith("UPDATE refresh_tokens SET revoked=")
+    assert "refresh_tokens.family = " in str(compiled)
+    assert claims["fam"] in compiled.params.values()
+    assert db.commits == 1
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.data = {}
+
+    def register_script(self, script):
+        async def unavailable(keys, args):
+            raise RedisConnectionError("down")
+
+        unavailable.registered_client = self
+        return unavailable
+
+    async def set(self, key, value, exat=None):
+        if self.fail:
+            raise RedisConnectionError("down")
+        self.data[key] = (str(value).encode(), exat)
+
+    async def get(self, key):
+        if self.fail:
+            raise RedisConnectionError("down")
+        entry = self.data.get(key)
+        return entry[0] if entry else None
+
+
+class MemoryStore(RefreshTokenStore):
+    def __init__(self):
+        self.tokens = {}
+
+    async def add(self, db, user_id, token, claims, defer=False):
+        self.tokens[token] = user_id
+
+    async def spend(self, db, token, claims):
+        return self.tokens.pop(token, None)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_keys_by_jti_and_expires_with_token(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(refresh_tokens, "get_redis", lambda: redis)
+    fallback = MemoryStore()
+    store = RedisRefreshTokenStore(fallback)
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+
+    await store.add(None, 7, token, claims)
+
+    assert redis.data == {f"refresh:{claims['jti']}": (b"7", claims["exp"])}
+    assert fallback.tokens == {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "script_result, expected, falls_back",
+    [(7, 7, False), (-1, None, False), (None, 8, True)],
+)
+async def test_redis_spend_outcomes(script_result, expected, falls_back):
+    fallback = MemoryStore()
+    store = RedisRefreshTokenStore(fallback)
+    token, claims = issue_refresh_token({"sub": "8", "tv": 0})
+    fallback.tokens[token] = 8
+    calls = []
+
+    async def script(keys, args):
+        calls.append(keys)
+        return script_result
+
+    store._script = lambda: script
+    assert await store.spend(None, token, claims) == expected
+    assert calls == [[f"refresh:{claims['jti']}", f"refresh_family:{claims['fam']}"]]
+    assert (token not in fallback.tokens) == falls_back
+
+
+@pytest.mark.asyncio
+async def test_redis_store_falls_back_to_postgres(monkeypatch):
+    redis = FakeRedis(fail=True)
+    monkeypatch.setattr(refresh_tokens, "get_redis", lambda: redis)
+    fallback = MemoryStore()
+    store = RedisRefreshTokenStore(fallback)
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+
+    await store.add(None, 7, token, claims)
+    assert fallback.tokens == {token: 7}
+
+    # Still spendable while Redis is down, via the fallback
+    assert await store.spend(None, token, claims) == 7
+    assert await store.spend(None, token, claims) is None
+
+
+class FlushSession:
+    """Session factory stand-in that records the batches it commits."""
+
+    def __init__(self, fail=False, reject=()):
+        self.fail = fail
+        # user ids whose rows violate a constraint
+        self.reject = set(reject)
+        self.batches = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def begin_nested(self):
+        return self
+
+    async def execute(self, statement):
+        if self.fail:
+            raise OSError("database unavailable")
+        params = compile_pg(statement).params
+        if any(params[key] in self.reject for key in params if key.startswith("user_id")):
+            raise IntegrityError(str(statement), params, Exception("foreign key violation"))
+        self.batches.append(statement)
+
+    async def commit(self):
+        pass
+
+
+def login_row(user_id):
+    token, claims = issue_refresh_token({"sub": str(user_id), "tv": 0})
+    return token, refresh_token_values(user_id, token, claims)
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_inserts_one_multi_row_statement():
+    session = FlushSession()
+    buffer = RefreshTokenWriteBuffer(interval=60, max_rows=2, max_pending=10, session_factory=session)
+    for user_id in range(3):
+        assert buffer.add(login_row(user_id)[1])
+    assert buffer._full.is_set()
+
+    assert await buffer.flush() == 3
+    assert len(buffer) == 0
+    first, second = session.batches
+    sql = str(compile_pg(first))
+    assert sql.startswith("INSERT INTO refresh_tokens")
+    assert sql.count("VALUES") == 1 and sql.count("), (") == 1
+    assert "), (" not in str(compile_pg(second))
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_keeps_rows_when_flush_fails():
+    session = FlushSession(fail=True)
+    buffer = RefreshTokenWriteBuffer(interval=60, max_rows=10, max_pending=2, session_factory=session)
+    assert buffer.add(login_row(1)[1]) and buffer.add(login_row(2)[1])
+    # Full: the login has to write its own row
+    assert not buffer.add(login_row(3)[1])
+
+    assert await buffer.flush() == 0
+    assert len(buffer) == 2
+
+    session.fail = False
+    await buffer.stop()
+    assert len(buffer) == 0 and len(session.batches) == 1
+    assert buffer.add(login_row(3)[1])
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_drops_rows_the_database_rejects():
+    session = FlushSession(reject={2})
+    buffer = RefreshTokenWriteBuffer(interval=60, max_rows=10, max_pending=10, session_factory=session)
+    for user_id in range(1, 4):
+        buffer.add(login_row(user_id)[1])
+
+    # The batch fails, then rows 1 and 3 go in one by one
+    assert await buffer.flush() == 2
+    assert len(buffer) == 0 and len(session.batches) == 2
+    assert buffer._pending == set()
+    assert buffer.retry_delay() == 60
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_backs_off_while_the_database_is_down():
+    session = FlushSession(fail=True)
+    buffer = RefreshTokenWriteBuffer(interval=0.05, max_rows=10, max_pending=10, session_factory=session)
+    buffer.add(login_row(1)[1])
+
+    delays = []
+    for _ in range(10):
+        await buffer.flush()
+        delays.append(buffer.retry_delay())
+    assert delays[:3] == [0.1, 0.2, 0.4]
+    assert delays[-1] == refresh_tokens.FLUSH_MAX_BACKOFF
+
+    session.fail = False
+    assert await buffer.flush() == 1
+    assert buffer.retry_delay() == 0.05
+
+
+@pytest.mark.asyncio
+async def test_spend_flushes_a_buffered_token_first():
+    session = FlushSession()
+    buffer = RefreshTokenWriteBuffer(interval=60, max_rows=10, max_pending=10, session_factory=session)
+    store = PostgresRefreshTokenStore(buffer)
+    token, claims = issue_refresh_token({"sub": "7", "tv": 0})
+    db = RecordingSession(user_id=7)
+
+    await store.add(db, 7, token, claims, defer=True)
+    assert len(buffer) == 1 and session.batches == []
+
+    assert await store.spend(db, token, claims) == 7
+    assert len(buffer) == 0 and len(session.batches) == 1
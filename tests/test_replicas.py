@@ -0,0 +1,100 @@
+"""
+Tests for read-replica selection and read-session routing.
+"""
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.db import database
+from app.db.database import RoutingSession
+from app.db.replicas import REPLICA_LAG_QUERY, ReplicaSet
+from app.models import User
+
+
+def _engine(name, checked_out=0):
+    pool = SimpleNamespace(logging_name=name, checkedout=lambda: checked_out)
+    return SimpleNamespace(name=name, sync_engine=SimpleNamespace(pool=pool))
+
+
+def test_round_robin_cycles_replicas():
+    replicas = ReplicaSet([_engine("a"), _engine("b")])
+    assert [replicas.choose().name for _ in range(4)] == ["a", "b", "a", "b"]
+
+
+def test_least_connections_picks_idlest_replica():
+    replicas = ReplicaSet([_engine("a", 3), _engine("b", 1)], strategy="least_connections")
+    assert replicas.choose().name == "b"
+
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        ReplicaSet([], strategy="random")
+
+
+@pytest.mark.asyncio
+async def test_lagging_and_unreachable_replicas_leave_rotation(monkeypatch):
+    a, b, c = _engine("a"), _engine("b"), _engine("c")
+    replicas = ReplicaSet([a, b, c], max_lag=5)
+    lags = {"a": 0.2, "b": 30.0, "c": None}
+
+    async def fake_lag(engine):
+        return lags[engine.name]
+
+    monkeypatch.setattr(replicas, "lag", fake_lag)
+    await replicas.refresh()
+    assert replicas.eligible == [a]
+
+    lags.update(a=None)
+    await replicas.refresh()
+    assert replicas.choose() is None
+
+
+def _queried_engine(name, lag):
+    """An engine whose lag query returns ``lag`` (None: WAL receiver not streaming)."""
+    class Connection:
+        async def execute(self, statement):
+            return SimpleNamespace(scalar=lambda: lag)
+
+    @asynccontextmanager
+    async def connect():
+        yield Connection()
+
+    engine = _engine(name)
+    engine.connect = connect
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_replica_without_streaming_receiver_leaves_rotation():
+    streaming, disconnected = _queried_engine("a", 0), _queried_engine("b", None)
+    replicas = ReplicaSet([streaming, disconnected], max_lag=5)
+    assert await replicas.lag(disconnected) is None
+    await replicas.refresh()
+    assert replicas.eligible == [streaming]
+
+
+def test_lag_query_requires_streaming_receiver():
+    sql = str(REPLICA_LAG_QUERY)
+    assert "pg_stat_wal_receiver" in sql
+    # Checked before the receive/replay equality that would report zero lag
+    assert sql.index("status = 'streaming'") < sql.index("pg_last_wal_receive_lsn()")
+
+
+def test_read_session_routes_reads_to_replica_until_it_writes(monkeypatch):
+    replica = SimpleNamespace(sync_engine=object())
+    monkeypatch.setattr(database.replica_set, "choose", lambda: replica)
+    session = RoutingSession(bind=database.engine.sync_engine, info={"read_only": True})
+
+    assert session.get_bind(clause=select(User.id)) is replica.sync_engine
+    assert session.get_bind(clause=insert(User)) is database.engine.sync_engine
+    # Pinned to the primary after the write
+    assert session.get_bind(clause=select(User.id)) is database.engine.sync_engine
+
+
+def test_regular_session_stays_on_primary(monkeypatch):
+    replica = SimpleNamespace(sync_engine=object())
+    monkeypatch.setattr(database.replica_set, "choose", lambda: replica)
+    session = RoutingSession(bind=database.engine.sync_engine)
+    assert session.get_bind(clause=select(User.id)) is database.engine.sync_engine
@@ -0,0 +1,41 @@
+"""
+Tests for the startup schema check.
+"""
+import pytest
+
+from app.db import schema
+from app.db.schema import SchemaVersionError, migration_head, prepare_schema
+
+
+def test_migration_head_is_cached():
+    head = migration_head()
+    assert head
+    assert migration_head() is head
+    assert migration_head.cache_info().hits >= 1
+
+
+@pytest.mark.asyncio
+async def test_check_passes_at_head(monkeypatch):
+    async def at_head(engine):
+        return migration_head()
+
+    monkeypatch.setattr(schema, "database_revision", at_head)
+    await prepare_schema(engine=None, mode="check")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("revision", [None, "0001"])
+async def test_check_fails_fast_on_mismatch(monkeypatch, revision):
+    async def behind(engine):
+        return revision
+
+    monkeypatch.setattr(schema, "database_revision", behind)
+    with pytest.raises(SchemaVersionError, match="alembic upgrade head"):
+        await prepare_schema(engine=None, mode="check")
+
+
+@pytest.mark.asyncio
+async def test_skip_and_unknown_modes():
+    await prepare_schema(engine=None, mode="skip")
+    with pytest.raises(ValueError):
+        await prepare_schema(engine=None, mode="migrate")
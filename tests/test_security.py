@@ -0,0 +1,71 @@
+"""
+Tests for password hashing helpers in app.core.security.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.config import settings
+from app.core.security import hash_password, verify_password, verify_password_async
+
+TEST_PASSWORD = "TestPassword123!"
+
+
+@pytest.mark.asyncio
+async def test_hash_password_roundtrip():
+    """Hashes produced off the event loop verify with both sync and async helpers."""
+    hashed = await hash_password(TEST_PASSWORD)
+    assert hashed != TEST_PASSWORD
+    assert verify_password(TEST_PASSWORD, hashed)
+    assert await verify_password_async(TEST_PASSWORD, hashed)
+    assert not await verify_password_async("WrongPassword123!", hashed)
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_rejects_when_saturated(monkeypatch):
+    """Jobs beyond the pool size plus queue size are rejected with a 503."""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_SIZE", 0)
+    capacity = max(settings.PASSWORD_HASH_POOL_SIZE, 1)
+    monkeypatch.setattr(security, "_hash_in_flight", capacity)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hash_password(TEST_PASSWORD)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_tracks_in_flight_jobs():
+    """The in-flight counter returns to zero once concurrent jobs finish."""
+    await asyncio.gather(*(hash_password(TEST_PASSWORD) for _ in range(3)))
+    assert security._hash_in_flight == 0
+
+
+def test_verify_and_update_rehashes_stale_parameters(monkeypatch):
+    """Hashes made with other cost settings are replaced after a successful verify."""
+    old_context = security.build_pwd_context(scheme="bcrypt", bcrypt_rounds=4)
+    stale_hash = old_context.hash(TEST_PASSWORD)
+
+    monkeypatch.setattr(
+        security, "pwd_context", security.build_pwd_context(scheme="bcrypt", bcrypt_rounds=5)
+    )
+    verified, new_hash = security.verify_and_update_password(TEST_PASSWORD, stale_hash)
+    assert verified
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+
+    verified, new_hash = security.verify_and_update_password("WrongPassword123!", stale_hash)
+    assert not verified
+    assert new_hash is None
+
+
+def test_verify_and_update_keeps_current_hash(monkeypatch):
+    """Hashes that already match the configured parameters are left alone."""
+    context = security.build_pwd_context(scheme="bcrypt", bcrypt_rounds=4)
+    monkeypatch.setattr(security, "pwd_context", context)
+    verified, new_hash = security.verify_and_update_password(
+        TEST_PASSWORD, context.hash(TEST_PASSWORD)
+    )
+    assert verified
+    assert new_hash is None
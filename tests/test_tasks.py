@@ -10,6 +10,7 @@ from fastapi import status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.security import refresh_token_digest
 from app.models.user import User
 from app.models.refresh_token import RefreshToken
 from app.models.verification_token import VerificationToken
@@ -97,7 +98,7 @@ async def test_cleanup_expired_tokens(db_session: AsyncSession):
     # Create expired tokens
     expired_refresh_token = RefreshToken(
         user_id=user.id,
-        token="expired_refresh_token",
+        token_hash=refresh_token_digest("expired_refresh_token"),
         expires_at=now - timedelta(days=1),
         created_at=now - timedelta(days=2)
     )
@@ -112,7 +113,7 @@ async def test_cleanup_expired_tokens(db_session: AsyncSession):
     # Create non-expired tokens
     valid_refresh_token = RefreshToken(
         user_id=user.id,
-        token="valid_refresh_token",
+        token_hash=refresh_token_digest("valid_refresh_token"),
         expires_at=now + timedelta(days=1),
         created_at=now
     )
@@ -129,9 +130,14 @@ async def test_cleanup_expired_tokens(db_session: AsyncSession):
     assert result["deleted_verification_tokens"] == 1
     
     # Verify only expired tokens were deleted
-    assert await db_session.get(RefreshToken, expired_refresh_token.id) is None
+    # Partitioned table: the primary key is (id, expires_at)
+    assert await db_session.get(
+        RefreshToken, (expired_refresh_token.id, expired_refresh_token.expires_at)
+    ) is None
     assert await db_session.get(VerificationToken, expired_verification_token.id) is None
-    assert await db_session.get(RefreshToken, valid_refresh_token.id) is not None
+    assert await db_session.get(
+        RefreshToken, (valid_refresh_token.id, valid_refresh_token.expires_at)
+    ) is not None
 
 @pytest.mark.asyncio
 @patch("app.tasks.cleanup.get_db")
@@ -0,0 +1,101 @@
+"""
+Tests for bulk admin operation targeting and per-id results.
+"""
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.schemas.user import BulkRoleUpdate, UserFilter, UserRole, UserSelection
+from app.services import user_bulk
+from app.services.user_bulk import bulk_results, lock_targets, selection_condition
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"ids": [1], "filter": {"role": "USER"}},
+    {"ids": []},
+    {"filter": {}},
+])
+def test_selection_requires_exactly_one_target(payload):
+    with pytest.raises(ValidationError):
+        UserSelection.model_validate(payload)
+
+
+def test_role_update_accepts_ids():
+    body = BulkRoleUpdate.model_validate({"ids": [3, 1], "role": "ADMIN"})
+    assert body.ids == [3, 1]
+    assert body.role == UserRole.ADMIN
+
+
+def test_ids_are_bound_as_single_array():
+    condition = selection_condition(UserSelection(ids=list(range(1000))))
+    compiled = condition.compile(dialect=postgresql.dialect())
+    assert "= ANY" in str(compiled)
+    assert len(compiled.params) == 1
+
+
+def test_filter_selection_builds_conditions():
+    condition = selection_condition(UserSelection(filter=UserFilter(is_verified=False)))
+    assert "is_verified" in str(condition)
+
+
+def test_results_for_ids_report_missing_once():
+    selection = UserSelection(ids=[1, 2, 2, 3])
+    assert bulk_results(selection, [3, 1]) == {
+        "affected": 2,
+        "results": [
+            {"id": 1, "status": "ok"},
+            {"id": 2, "status": "not_found"},
+            {"id": 3, "status": "ok"},
+        ],
+    }
+
+
+def test_results_for_filter_list_matches():
+    selection = UserSelection(filter=UserFilter(role=UserRole.USER))
+    assert bulk_results(selection, [5, 4]) == {
+        "affected": 2,
+        "results": [{"id": 4, "status": "ok"}, {"id": 5, "status": "ok"}],
+    }
+
+
+class MatchingSession:
+    """Answers the target lookup with ``matches`` ids, honouring its LIMIT."""
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.statements = []
+        self.rolled_back = False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        limit = statement._limit_clause.value
+        ids = list(range(1, self.matches + 1))[:limit]
+        return type("Result", (), {"scalars": lambda self: iter(ids)})()
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.asyncio
+async def test_selection_over_cap_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ROWS", 3)
+    session = MatchingSession(matches=10)
+    with pytest.raises(HTTPException) as exc_info:
+        await user_bulk.bulk_verify(session, UserSelection(filter=UserFilter(is_verified=False)))
+    assert exc_info.value.status_code == 422
+    assert session.rolled_back
+    # Only the bounded, locking lookup ran: nothing was updated
+    assert len(session.statements) == 1
+    compiled = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "LIMIT" in compiled and "FOR UPDATE" in compiled
+
+
+@pytest.mark.asyncio
+async def test_selection_at_cap_returns_targets(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ROWS", 3)
+    session = MatchingSession(matches=3)
+    assert await lock_targets(session, UserSelection(filter=UserFilter(is_verified=False))) == [1, 2, 3]
+    assert not session.rolled_back
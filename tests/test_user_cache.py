@@ -0,0 +1,197 @@
+"""
+Tests for the read-through user cache.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import user_cache as user_cache_module
+from app.core.cache_bus import LocalInvalidationBus
+from app.core.redis import create_pubsub_client, get_redis
+from app.core.user_cache import UserCache, deserialize_user, serialize_user
+from app.models import USER_RECORD_COLUMNS, UserRecord, UserRole
+
+
+def _user(user_id=1, **overrides):
+    fields = dict(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        first_name="Test",
+        last_name="User",
+        is_verified=True,
+        role=UserRole.ADMIN,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        updated_at=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        token_version=2,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    """Stands in for AsyncSession.execute and counts database round trips."""
+
+    def __init__(self, *users):
+        self.users = {user.id: user for user in users}
+        self.calls = 0
+
+    async def execute(self, statement):
+        self.calls += 1
+        user_id = statement.whereclause.right.value
+        user = self.users.get(user_id)
+        if user is None:
+            return FakeResult(None)
+        return FakeResult(tuple(getattr(user, column.key) for column in USER_RECORD_COLUMNS))
+
+
+def test_serialization_roundtrip():
+    record = UserRecord(**vars(_user()))
+    cached = deserialize_user(serialize_user(record))
+    assert cached.id == 1
+    assert cached.email == "user1@example.com"
+    assert cached.role == UserRole.ADMIN.value
+    assert cached.created_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert cached.token_version == 2
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_repeat_reads():
+    cache = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0)
+    db = FakeSession(_user())
+    assert (await cache.get(db, 1)).email == "user1@example.com"
+    assert (await cache.get(db, 1)).email == "user1@example.com"
+    assert db.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload():
+    cache = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0)
+    db = FakeSession(_user())
+    await cache.get(db, 1)
+    db.users[1] = _user(first_name="Renamed")
+    await cache.invalidate([1])
+    assert (await cache.get(db, 1)).first_name == "Renamed"
+    assert db.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_user_is_not_cached():
+    cache = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0)
+    db = FakeSession()
+    assert await cache.get(db, 99) is None
+    assert await cache.get(db, 99) is None
+    assert db.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_broadcast_to_other_workers():
+    """An invalidation in one worker evicts the entry from every subscribed cache."""
+    bus = LocalInvalidationBus()
+    writer = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0, bus=bus)
+    reader = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0)
+    await bus.start(reader.evict_local, reader.reset_local)
+
+    db = FakeSession(_user())
+    await reader.get(db, 1)
+    await writer.invalidate([1])
+    assert reader.local.get(1) is None
+
+
+def test_subscriber_reads_do_not_time_out():
+    """An idle invalidation channel must not look like a disconnect."""
+    subscriber = create_pubsub_client().connection_pool.connection_kwargs
+    assert subscriber["socket_timeout"] is None
+    assert subscriber["health_check_interval"] > 0
+    assert get_redis().connection_pool.connection_kwargs["socket_timeout"] is not None
+
+
+class RacingSession(FakeSession):
+    """A writer commits and invalidates while the reader's load is in flight."""
+
+    def __init__(self, cache, *users):
+        super().__init__(*users)
+        self.cache = cache
+
+    async def execute(self, statement):
+        result = await super().execute(statement)
+        self.users[1] = _user(token_version=3)
+        await self.cache.invalidate([1])
+        return result
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_cached_locally():
+    cache = UserCache(local_max_size=10, local_ttl=60, redis_ttl=0)
+    db = RacingSession(cache, _user())
+    assert (await cache.get(db, 1)).token_version == 2
+    assert cache.local.get(1) is None
+
+
+class FakeRedis:
+    """Enough of redis.asyncio for the cache: plain keys, INCR and the fill script."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        async def fill(keys, args):
+            record_key, generation_key = keys
+            raw, generation, _ = args
+            if self.data.get(generation_key, b"").decode() != generation:
+                return 0
+            self.data[record_key] = raw
+            return 1
+
+        fill.registered_client = self
+        return fill
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def delete(self, *keys):
+        self.commands.append(lambda: [self.redis.data.pop(key, None) for key in keys])
+
+    def incr(self, key):
+        def run():
+            self.redis.data[key] = str(int(self.redis.data.get(key, b"0")) + 1).encode()
+        self.commands.append(run)
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_written_to_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(user_cache_module, "get_redis", lambda: redis)
+    cache = UserCache(local_max_size=10, local_ttl=60, redis_ttl=300)
+
+    await cache.get(RacingSession(cache, _user()), 1)
+    assert "user:1" not in redis.data
+
+    # Without a concurrent write the fill lands
+    db = FakeSession(_user(token_version=3))
+    assert (await cache.get(db, 1)).token_version == 3
+    assert deserialize_user(redis.data["user:1"]).token_version == 3
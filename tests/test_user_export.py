@@ -0,0 +1,113 @@
+"""
+Tests for the streaming user export.
+"""
+import csv
+import io
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from app.api.v1 import user as user_routes
+from app.core.security import create_access_token, user_token_claims
+from app.models import User, UserRole
+
+CREATED_AT = datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def export_session(monkeypatch, db_session):
+    """Serve the export's own read session from the test transaction."""
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    monkeypatch.setattr(user_routes, "AsyncReadSessionLocal", session_factory)
+    return db_session
+
+
+@pytest.fixture
+async def members(db_session, admin_user):
+    users = [
+        User(
+            email="ann@example.com",
+            hashed_password="not-a-real-hash",
+            first_name="Ann",
+            last_name="Lee",
+            is_verified=True,
+            role=UserRole.USER,
+            created_at=CREATED_AT,
+            updated_at=CREATED_AT,
+        ),
+        User(
+            email="bob@example.com",
+            hashed_password="not-a-real-hash",
+            first_name="Bob",
+            last_name=None,
+            is_verified=False,
+            role=UserRole.USER,
+            created_at=CREATED_AT,
+            updated_at=CREATED_AT,
+        ),
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export(client, export_session, admin_headers, admin_user, members):
+    response = client.get("/api/v1/users/export", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="users.ndjson"' in response.headers["content-disposition"]
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == sorted([admin_user.id] + [u.id for u in members])
+    ann = next(row for row in rows if row["email"] == "ann@example.com")
+    assert ann == {
+        "id": members[0].id,
+        "email": "ann@example.com",
+        "first_name": "Ann",
+        "last_name": "Lee",
+        "role": "USER",
+        "is_verified": True,
+        "created_at": CREATED_AT.isoformat(),
+        "updated_at": CREATED_AT.isoformat(),
+    }
+    assert "hashed_password" not in ann
+
+
+@pytest.mark.asyncio
+async def test_csv_export(client, export_session, admin_headers, admin_user, members):
+    response = client.get("/api/v1/users/export?format=csv", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="users.csv"' in response.headers["content-disposition"]
+
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == [
+        "id", "email", "first_name", "last_name", "role", "is_verified", "created_at", "updated_at",
+    ]
+    assert [int(row[0]) for row in rows] == sorted([admin_user.id] + [u.id for u in members])
+    bob = next(row for row in rows if row[1] == "bob@example.com")
+    assert bob == [
+        str(members[1].id), "bob@example.com", "Bob", "", "USER", "False",
+        CREATED_AT.isoformat(), CREATED_AT.isoformat(),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_applies_filters(client, export_session, admin_headers, members):
+    response = client.get("/api/v1/users/export?role=USER&is_verified=false", headers=admin_headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["email"] for row in rows] == ["bob@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_non_admin(client, export_session, members):
+    token = create_access_token(user_token_claims(members[0]))
+    response = client.get("/api/v1/users/export", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
@@ -0,0 +1,144 @@
+"""
+Tests for bulk user import parsing and batch hashing.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import hash_passwords, verify_password
+from app.schemas.user import UserFileFormat, UserRole
+from app.services import user_import
+from app.services.user_import import import_users, parse_import_rows
+
+PASSWORD = "Sup3rSecret!"
+
+
+def test_parse_ndjson_rows():
+    body = "\n".join([
+        json.dumps({"email": "a@example.com", "password": PASSWORD, "first_name": "Ann"}),
+        "",
+        json.dumps({"email": "b@example.com", "password": PASSWORD, "role": "ADMIN"}),
+    ]).encode()
+    rows, errors = parse_import_rows(body, UserFileFormat.NDJSON, max_rows=10)
+    assert errors == []
+    assert [line for line, _ in rows] == [1, 3]
+    assert rows[0][1].first_name == "Ann"
+    assert rows[1][1].role == UserRole.ADMIN
+
+
+def test_parse_csv_rows_treats_empty_cells_as_missing():
+    body = (
+        "email,password,first_name,last_name\n"
+        f"a@example.com,{PASSWORD},,Smith\n"
+    ).encode()
+    rows, errors = parse_import_rows(body, UserFileFormat.CSV, max_rows=10)
+    assert errors == []
+    (line, user_in), = rows
+    assert line == 2
+    assert user_in.first_name is None
+    assert user_in.last_name == "Smith"
+    assert user_in.role == UserRole.USER
+
+
+def test_parse_reports_invalid_rows_by_line():
+    body = "\n".join([
+        "{not json",
+        json.dumps(["a list"]),
+        json.dumps({"email": "not-an-email", "password": PASSWORD}),
+        json.dumps({"email": "ok@example.com", "password": "short"}),
+        json.dumps({"email": "good@example.com", "password": PASSWORD}),
+    ]).encode()
+    rows, errors = parse_import_rows(body, UserFileFormat.NDJSON, max_rows=10)
+    assert [line for line, _ in rows] == [5]
+    assert [error["line"] for error in errors] == [1, 2, 3, 4]
+    assert "email" in errors[2]["error"]
+    assert "password" in errors[3]["error"]
+
+
+def test_parse_rejects_oversized_import():
+    body = "\n".join(
+        json.dumps({"email": f"u{i}@example.com", "password": PASSWORD}) for i in range(3)
+    ).encode()
+    with pytest.raises(HTTPException) as exc_info:
+        parse_import_rows(body, UserFileFormat.NDJSON, max_rows=2)
+    assert exc_info.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_hash_passwords_preserves_order():
+    passwords = [f"{PASSWORD}{i}" for i in range(3)]
+    hashes = await hash_passwords(passwords, workers=0)
+    assert len(hashes) == len(passwords)
+    for password, hashed in zip(passwords, hashes):
+        assert verify_password(password, hashed)
+    assert await hash_passwords([], workers=0) == []
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    instances = []
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers=max_workers)
+        self.shutdown_calls = []
+        RecordingExecutor.instances.append(self)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdown_calls.append((wait, cancel_futures))
+        super().shutdown(wait=False, cancel_futures=cancel_futures)
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_shutdown_never_waits_on_the_event_loop(monkeypatch):
+    RecordingExecutor.instances = []
+    monkeypatch.setattr(security, "ProcessPoolExecutor", RecordingExecutor)
+    hashes = await hash_passwords([PASSWORD, PASSWORD], workers=2)
+    assert len(hashes) == 2
+
+    (executor,) = RecordingExecutor.instances
+    assert executor.shutdown_calls == [(False, True)]
+
+
+class ImportSession:
+    """Records the order of session calls made by import_users."""
+
+    def __init__(self):
+        self.events = []
+
+    async def execute(self, statement, params=None):
+        self.events.append("execute")
+        return self
+
+    def scalars(self):
+        return []
+
+    def all(self):
+        return []
+
+    async def rollback(self):
+        self.events.append("rollback")
+
+    async def commit(self):
+        self.events.append("commit")
+
+
+@pytest.mark.asyncio
+async def test_import_hashes_outside_a_transaction(monkeypatch):
+    db = ImportSession()
+
+    async def fake_hash(passwords, workers):
+        db.events.append("hash")
+        return ["hashed"] * len(passwords)
+
+    monkeypatch.setattr(user_import, "hash_passwords", fake_hash)
+    rows, errors = parse_import_rows(
+        json.dumps({"email": "a@example.com", "password": PASSWORD}).encode(),
+        UserFileFormat.NDJSON,
+        max_rows=10,
+    )
+    await import_users(db, rows, errors)
+
+    # The duplicate check's transaction ends before hashing starts
+    assert db.events[:3] == ["execute", "rollback", "hash"]
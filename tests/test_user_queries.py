@@ -0,0 +1,143 @@
+"""
+Tests for user listing helpers (filters, keyset cursors and search).
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.models import User, UserRole as ModelUserRole, update_user_record
+
+from app.schemas.user import UserFilter, UserRole
+from app.services.users import decode_cursor, encode_cursor, user_filter_conditions, user_search_query
+
+
+def test_cursor_roundtrip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "W10", "eyJhIjoxfQ"])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
+
+
+def test_filter_conditions():
+    assert user_filter_conditions(UserFilter()) == []
+    filters = UserFilter(
+        role=UserRole.ADMIN,
+        is_verified=False,
+        created_after=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        created_before=datetime(2024, 2, 1, tzinfo=timezone.utc),
+    )
+    assert len(user_filter_conditions(filters)) == 4
+
+
+def test_search_query_escapes_wildcards_and_caps_results():
+    query = user_search_query("50%_off", limit=20, dialect_name="sqlite")
+    params = query.compile().params
+    assert "%50\\%\\_off%" in params.values()
+    assert "50\\%\\_off%" in params.values()
+    assert 20 in params.values()
+
+
+def test_search_query_orders_by_similarity_on_postgres():
+    from sqlalchemy.dialects import postgresql
+
+    query = user_search_query("ali", limit=10, dialect_name="postgresql")
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "similarity" in sql
+    assert "ILIKE" in sql
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("q", ["  a  ", "ab ", "\t\tx\t"])
+async def test_search_rejects_short_term_after_strip(client, admin_headers, q):
+    response = client.get("/api/v1/users/search", params={"q": q}, headers=admin_headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_search_strips_term(client, admin_headers):
+    response = client.get("/api/v1/users/search", params={"q": "  admin  "}, headers=admin_headers)
+    assert response.status_code == 200
+    assert [user["email"] for user in response.json()] == ["admin@example.com"]
+
+
+def _listed_user(email, created_at, is_verified):
+    return User(
+        email=email,
+        hashed_password="not-a-real-hash",
+        is_verified=is_verified,
+        role=ModelUserRole.USER,
+        created_at=created_at,
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_users_filtered_pages(client, db_session, admin_headers):
+    day = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    later = datetime(2024, 5, 2, tzinfo=timezone.utc)
+    users = {
+        "old": _listed_user("old@example.com", day, False),
+        "tie_a": _listed_user("tie_a@example.com", later, False),
+        "tie_b": _listed_user("tie_b@example.com", later, False),
+        "verified_old": _listed_user("verified_old@example.com", day, True),
+        "verified_new": _listed_user("verified_new@example.com", later, True),
+    }
+    db_session.add_all(users.values())
+    await db_session.commit()
+    ids = {name: user.id for name, user in users.items()}
+    params = {"is_verified": "false", "limit": 2}
+
+    first = client.get("/api/v1/users/", params=params, headers=admin_headers).json()
+    # Newest first, ties broken by id descending; verified users (and the admin) excluded
+    assert [u["id"] for u in first["items"]] == sorted([ids["tie_a"], ids["tie_b"]], reverse=True)
+    assert first["next_cursor"]
+
+    # A newer matching row added between pages does not shift the cursor
+    db_session.add(_listed_user("newest@example.com", datetime(2024, 6, 1, tzinfo=timezone.utc), False))
+    await db_session.commit()
+
+    second = client.get(
+        "/api/v1/users/", params={**params, "cursor": first["next_cursor"]}, headers=admin_headers
+    ).json()
+    assert [u["id"] for u in second["items"]] == [ids["old"]]
+    assert second["next_cursor"] is None
+    assert all(not u["is_verified"] for u in first["items"] + second["items"])
+
+
+class RecordingSession:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def first(self):
+        return self.row
+
+
+@pytest.mark.asyncio
+async def test_update_user_record_is_one_statement():
+    row = (7, "a@example.com", None, None, True, "USER", None, None, 3)
+    db = RecordingSession(row)
+    record = await update_user_record(db, 7, {"token_version": User.token_version + 1})
+
+    assert record.id == 7 and record.token_version == 3
+    (statement,) = db.statements
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE users SET token_version=(users.token_version + ")
+    assert "WHERE users.id = " in sql
+    assert "RETURNING users.id, users.email" in sql
+    assert "hashed_password" not in sql
+
+
+@pytest.mark.asyncio
+async def test_update_user_record_missing_user():
+    assert await update_user_record(RecordingSession(None), 7, {"first_name": "A"}) is None